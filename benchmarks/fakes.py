@@ -0,0 +1,301 @@
+""" Local stand-ins for the Telegram Bot API, NocoDB, EagleAPI and Shlink, with injectable latency and failures. """
+
+import json
+import time
+import random
+import asyncio
+import logging
+from urllib.parse import urlsplit, parse_qs
+
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+class FakeServer:
+    """
+    Minimal HTTP/1.1 server with keep-alive, enough for the bot's pooled httpx clients.
+    Every request waits latency (+ uniform jitter) seconds, then fails with failure_status at the given rate,
+    otherwise it is answered by handle(). Subclasses implement handle().
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, failure_status: int = 503):
+        """ Initialize the server; it listens once start() is awaited. """
+
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.requests = 0
+        self.failures = 0
+        self.url: str | None = None
+        self._server: asyncio.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1") -> str:
+        """ Listen on a free local port and return the base URL. """
+
+        self._server = await asyncio.start_server(self._serve, host, 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        logging.info(f"benchmarks/fakes - {self.name} stand-in listening on {self.url}")
+        return self.url
+
+    def close(self) -> None:
+        """ Stop accepting connections. """
+
+        if self._server:
+            self._server.close()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Answer requests on one connection until the client closes it. """
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._respond(method, target, headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            return
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str, headers: dict, body: bytes) -> tuple[int, object]:
+        """ Apply the injected latency and failures, then dispatch to handle(). """
+
+        self.requests += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.failure_rate and random.random() < self.failure_rate:
+            self.failures += 1
+            return self.failure_status, self.error(self.failure_status)
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return self.handle(method, url.path, query, headers, body)
+
+    def error(self, status: int) -> object:
+        """ Body of an injected failure. """
+
+        return {"error": REASONS.get(status, "error")}
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes) -> tuple[int, object]:
+        """ Return (status, JSON body) for a request. """
+
+        raise NotImplementedError
+
+class FakeBotAPI(FakeServer):
+    """ Bot API stand-in: answers the methods the bot calls with well-formed results and remembers the polls it sent. """
+
+    name = "Telegram Bot API"
+
+    def __init__(self, username: str = "eagletrtbot", **kwargs):
+        """ Initialize the stand-in for a bot with the given username. """
+
+        super().__init__(**kwargs)
+        self.username = username
+        self.poll_ids: list[str] = []  # Ids of the polls sent so far, answered by the replayed poll answers
+        self.calls: dict[str, int] = {}
+        self._message_id = 0
+
+    def error(self, status: int) -> object:
+        """ Bot API error body, which PTB turns into an exception. """
+
+        return {"ok": False, "error_code": status, "description": REASONS.get(status, "error")}
+
+    @staticmethod
+    def _params(headers: dict, body: bytes) -> dict:
+        """ Decode the request parameters; PTB sends form fields with JSON-encoded values, or multipart when uploading files. """
+
+        content_type = headers.get("content-type", "")
+        if content_type.startswith("application/json"):
+            return json.loads(body or b"{}")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            params = {}
+            for key, values in parse_qs(body.decode()).items():
+                try:
+                    params[key] = json.loads(values[-1])
+                except ValueError:
+                    params[key] = values[-1]
+            return params
+        return {}
+
+    def _message(self, params: dict, **fields) -> dict:
+        """ Build a Message sent by the bot into the requested chat. """
+
+        self._message_id += 1
+        chat_id = params.get("chat_id", 0)
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup" if isinstance(chat_id, int) and chat_id < 0 else "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "Bot", "username": self.username},
+            **fields
+        }
+        if params.get("message_thread_id"):
+            message["message_thread_id"] = params["message_thread_id"]
+        return message
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes) -> tuple[int, object]:
+        """ Dispatch on the API method, the last path segment of /bot<token>/<method>. """
+
+        api_method = path.rsplit("/", 1)[-1]
+        self.calls[api_method] = self.calls.get(api_method, 0) + 1
+        params = self._params(headers, body)
+
+        if api_method == "getMe":
+            result = {
+                "id": 1, "is_bot": True, "first_name": "Bot", "username": self.username,
+                "can_join_groups": True, "can_read_all_group_messages": False, "supports_inline_queries": False
+            }
+        elif api_method == "sendPoll":
+            poll_id = str(random.getrandbits(63))
+            self.poll_ids.append(poll_id)
+            options = [option["text"] if isinstance(option, dict) else option for option in params.get("options", [])]
+            result = self._message(params, poll={
+                "id": poll_id,
+                "question": params.get("question", ""),
+                "options": [{"persistent_id": str(i), "text": text, "voter_count": 0} for i, text in enumerate(options)],
+                "total_voter_count": 0,
+                "is_closed": False,
+                "is_anonymous": params.get("is_anonymous", True),
+                "type": params.get("type", "regular"),
+                "allows_multiple_answers": False,
+                "allows_revoting": False,
+                "members_only": False,
+                "correct_option_id": params.get("correct_option_id")
+            })
+        elif api_method == "sendMediaGroup":
+            result = [self._message(params, photo=[{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}]) for _ in params.get("media", [])]
+        elif api_method == "sendPhoto":
+            result = self._message(params, photo=[{"file_id": "photo", "file_unique_id": "photo", "width": 1, "height": 1}], caption=params.get("caption"))
+        elif api_method == "sendDocument":
+            result = self._message(params, document={"file_id": "document", "file_unique_id": "document"})
+        elif api_method in ("sendMessage", "editMessageText"):
+            result = self._message(params, text=params.get("text", ""))
+        else:
+            # setMyCommands, setMessageReaction, deleteWebhook, ...
+            result = True
+
+        return 200, {"ok": True, "result": result}
+
+class FakeNocoDB(FakeServer):
+    """
+    NocoDB stand-in serving a synthetic member base: members named user1..userN, a few tags of every kind, and each
+    tag linked to a deterministic slice of the members. Quiz stats writes are accepted and counted.
+    """
+
+    name = "NocoDB"
+
+    # Tags served for every kind of tag table
+    TAGS = {
+        "area": ["sw", "hw", "mgt", "cm"],
+        "workgroup": ["telemetry", "battery", "powertrain"],
+        "project": ["fenice", "chimera"],
+        "role": ["lead", "board"]
+    }
+
+    def __init__(self, tables: dict[str, str], members: int = 200, **kwargs):
+        """ Initialize the stand-in; tables maps each NocoDB table id in the config to its section name. """
+
+        super().__init__(**kwargs)
+        self.tables = tables
+        self.writes = 0
+        updated_at = "2024-01-01 00:00:00+00:00"
+
+        self.records: dict[str, list[dict]] = {
+            "members": [
+                {"Id": n, "Telegram Username": f"@user{n}", "Team Email": f"user{n}@eagletrt.it", "UpdatedAt": updated_at}
+                for n in range(1, members + 1)
+            ],
+            "quiz": []
+        }
+        self.links: dict[tuple[str, int], list[int]] = {}
+        for kind, tags in self.TAGS.items():
+            self.records[kind] = [{"Id": i + 1, "Tag": tag, "UpdatedAt": updated_at} for i, tag in enumerate(tags)]
+            for i in range(len(tags)):
+                self.links[(kind, i + 1)] = [n for n in range(1, members + 1) if n % len(tags) == i]
+
+    def tags(self) -> list[str]:
+        """ Every tag served, in '@tag' form. """
+
+        return [f"@{tag}" for tags in self.TAGS.values() for tag in tags]
+
+    @staticmethod
+    def _page(records: list[dict], query: dict) -> dict:
+        """ Return one page of records in NocoDB's list format, projected to the requested fields. """
+
+        offset, limit = int(query.get("offset", 0)), int(query.get("limit", 25))
+        page = records[offset:offset + limit]
+        if query.get("fields"):
+            fields = query["fields"].split(",")
+            page = [{key: value for key, value in record.items() if key in fields} for record in page]
+        return {"list": page, "pageInfo": {"totalRows": len(records), "isLastPage": offset + limit >= len(records)}}
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes) -> tuple[int, object]:
+        """ Serve /api/v2/tables/{table}/records and /api/v2/tables/{table}/links/{link}/records/{id}. """
+
+        parts = path.strip("/").split("/")
+        if len(parts) < 5 or parts[:3] != ["api", "v2", "tables"] or parts[4] not in ("records", "links"):
+            return 404, {"msg": "not found"}
+        kind = self.tables.get(parts[3])
+
+        if parts[4] == "links":
+            members = {record["Id"]: record for record in self.records["members"]}
+            linked = [{"Id": member_id} for member_id in self.links.get((kind, int(parts[-1])), []) if member_id in members]
+            return 200, self._page(linked, query)
+
+        if method == "GET":
+            # Filters are ignored: the bot re-checks UpdatedAt watermarks itself, and quiz stats start empty
+            return 200, self._page(self.records.get(kind, []), query)
+
+        self.writes += 1
+        return 200, [{"Id": i + 1} for i in range(len(json.loads(body or b"[]")))]
+
+class FakeEagleAPI(FakeServer):
+    """ EagleAPI stand-in: a fixed set of members in the lab and fixed monthly hours. """
+
+    name = "EagleAPI"
+
+    def __init__(self, inlab: int = 5, **kwargs):
+        """ Initialize the stand-in with the first inlab members of the synthetic member base in the lab. """
+
+        super().__init__(**kwargs)
+        self.people = [f"user{n}@eagletrt.it" for n in range(1, inlab + 1)]
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes) -> tuple[int, object]:
+        """ Serve /lab/inlab and /lab/ore. """
+
+        if path == "/lab/inlab":
+            return 200, {"people": self.people, "count": len(self.people)}
+        if path == "/lab/ore":
+            return 200, {"ore": 12.5}
+        return 404, {"error": "not found"}
+
+class FakeShlink(FakeServer):
+    """ Shlink stand-in: every long URL gets a new short URL. """
+
+    name = "Shlink"
+
+    def handle(self, method: str, path: str, query: dict, headers: dict, body: bytes) -> tuple[int, object]:
+        """ Serve POST /rest/v3/short-urls. """
+
+        if method == "POST" and path == "/rest/v3/short-urls":
+            return 200, {"shortUrl": f"https://s.example/{self.requests}"}
+        return 404, {"detail": "not found"}
@@ -0,0 +1,413 @@
+"""
+Update-replay benchmark: builds the real application from main.py against a local fake Bot API and local NocoDB,
+EagleAPI and Shlink stand-ins, replays a synthetic stream of updates at a controlled rate and reports throughput and
+end-to-end latency percentiles per handler.
+
+Run from the repository root:
+    python -m benchmarks.replay --rate 50 --duration 30
+    python -m benchmarks.replay --backend-latency 80 --backend-failure-rate 0.05 --json run.json
+    python -m benchmarks.replay --baseline run.json --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+from benchmarks.fakes import FakeBotAPI, FakeNocoDB, FakeEagleAPI, FakeShlink
+from main import build_application
+from modules.config import load_config
+from modules.logs import setup_logging
+from modules import tracing
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+
+TOKEN = "123456:BENCHMARK"
+
+# Table ids written to the benchmark config, mapped to their [NocoDB.*] section
+TABLES = {f"bench_{section}": section for section in ("members", "area", "workgroup", "project", "role", "quiz")}
+
+# Areas of the seeded quiz questions
+AREAS = ["CM", "HW", "SW"]
+
+# Chats the replayed messages are spread over; each is a forum with a few threads
+CHATS = [-1001000000000 - n for n in range(8)]
+THREADS = [None, 2, 3]
+
+# Replayed stream kinds, labelled like modules/logs labels the handler of an update
+LABELS = {"mention": "message", "odg": "/odg", "question": "/question", "poll": "poll_answer", "qr": "/qr"}
+
+CONFIG = """
+[Settings]
+ConsoleLogLevel = 'WARNING'
+FileLogLevel = 'INFO'
+areas = {areas}
+NOCO_URL = '{nocodb}'
+EAGLE_API_URL = '{eagle}'
+SHLINK_API_URL = '{shlink}'
+ConcurrentUpdates = {concurrent_updates}
+QuizLogFlushInterval = 5
+
+[Whitelist]
+General = ['@everyone']
+Quiz = ['@lead']
+QRcodeGroups = {qr_groups}
+cron = '* * * * *'
+
+[Features]
+EAgleAPIIntegration = true
+NocoDBIntegration = true
+ODGCommand = true
+IDCommand = false
+MentionHandler = true
+Whitelist = true
+QRcodeGenerator = {qr}
+FSQuiz = true
+FSQuizLogging = true
+FSQuizScheduledSends = false
+
+[Paths]
+DatabasePath = '{workdir}/botDatabase.db'
+QuizDBPath = '{workdir}/quizDatabase.db'
+LogFilePath = '{workdir}/logFile.log'
+CacheSnapshotPath = '{workdir}/cache.json'
+"""
+
+class Recorder:
+    """ Remembers when every replayed update was enqueued and when the application finished it. """
+
+    def __init__(self):
+        """ Initialize empty records. """
+
+        self.sent: dict[int, tuple[str, float]] = {}  # Update id -> (label, enqueue time)
+        self.done: dict[int, float] = {}  # Update id -> end-to-end latency in seconds
+        self.errors: set[int] = set()
+        self._next_id = 0
+
+    def next_id(self) -> int:
+        """ Return a fresh update id. """
+
+        self._next_id += 1
+        return self._next_id
+
+    def sent_now(self, update_id: int, label: str) -> None:
+        """ Record that an update is being enqueued. """
+
+        self.sent[update_id] = (label, time.perf_counter())
+
+    async def finished(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """ Runs in the last handler group, after the update's handler returned or failed. """
+
+        if update.update_id in self.sent:
+            self.done[update.update_id] = time.perf_counter() - self.sent[update.update_id][1]
+
+    async def failed(self, update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """ Error handler: count the update as failed. """
+
+        if isinstance(update, Update):
+            self.errors.add(update.update_id)
+
+    @property
+    def pending(self) -> int:
+        """ Updates enqueued but not finished yet; updates stopped by the auth gate stay pending. """
+
+        return len(self.sent) - len(self.done)
+
+def percentile(values: list[float], fraction: float) -> float:
+    """ Nearest-rank percentile of sorted values. """
+
+    return values[min(len(values) - 1, max(0, round(fraction * len(values) + 0.5) - 1))]
+
+def write_config(workdir: str, nocodb: FakeNocoDB, eagle: FakeEagleAPI, shlink: FakeShlink, args: argparse.Namespace) -> str:
+    """ Write a config.ini pointing every backend at its stand-in and every file into workdir; returns its path. """
+
+    config = CONFIG.format(
+        areas=json.dumps(AREAS),
+        nocodb=nocodb.url,
+        eagle=eagle.url,
+        shlink=shlink.url,
+        concurrent_updates=args.concurrent_updates,
+        qr_groups=json.dumps([str(chat) for chat in CHATS]),
+        qr="true" if args.mix.get("qr") else "false",
+        workdir=workdir
+    )
+    for table, section in TABLES.items():
+        config += f"\n[NocoDB.{section}]\ntable = '{table}'\n"
+        if section == "members":
+            config += "view = 'bench_view'\n"
+        elif section != "quiz":
+            config += f"link = 'bench_{section}_members'\n"
+
+    path = os.path.join(workdir, "config.ini")
+    with open(path, "w") as f:
+        f.write(config)
+    return path
+
+async def seed_quiz(questions: int) -> None:
+    """ Fill the empty benchmark quiz database with valid four-answer questions and rebuild the question index. """
+
+    from pony.orm import db_session
+    from modules.quiz import Quiz, Questions, Answers, Areas, revalidate
+
+    with db_session:
+        areas = [Areas(name=name) for name in AREAS]
+        quiz = Quiz(year="2024", class_="EV")
+        for n in range(1, questions + 1):
+            question = Questions(id=n, quiz=quiz, text=f"Benchmark question {n}?", type="multiple_choice", areas=[areas[n % len(areas)]])
+            for option in range(4):
+                Answers(question=question, answer_text=f"Answer {option}", is_correct=option == n % 4)
+
+    await revalidate()
+
+def message_update(update_id: int, user: int, chat: int, thread: int | None, text: str) -> dict:
+    """ Build a group message update; commands carry the bot_command entity Telegram adds. """
+
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat, "type": "supergroup", "title": "Benchmark", "is_forum": True},
+        "from": {"id": user, "is_bot": False, "first_name": "User", "last_name": str(user), "username": f"user{user}"},
+        "text": text
+    }
+    if thread:
+        message["message_thread_id"] = thread
+        message["is_topic_message"] = True
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+def poll_answer_update(update_id: int, user: int, poll_id: str) -> dict:
+    """ Build a poll answer update; option persistent ids match the ones the fake Bot API gives poll options. """
+
+    option = random.randrange(4)
+    return {
+        "update_id": update_id,
+        "poll_answer": {
+            "poll_id": poll_id,
+            "user": {"id": user, "is_bot": False, "first_name": "User", "username": f"user{user}"},
+            "option_ids": [option],
+            "option_persistent_ids": [str(option)]
+        }
+    }
+
+def generate(kind: str, recorder: Recorder, bot_api: FakeBotAPI, nocodb: FakeNocoDB, args: argparse.Namespace) -> list[tuple[str, dict]]:
+    """ Return the (label, update) pairs of one replayed event; an /odg event is a burst in a single thread. """
+
+    user = random.randint(1, args.members)
+    chat, thread = random.choice(CHATS), random.choice(THREADS)
+
+    if kind == "poll" and not bot_api.poll_ids:
+        # Nothing to answer before the first poll went out
+        kind = "question"
+
+    if kind == "mention":
+        tags = random.sample(nocodb.tags() + ["@inlab"], k=random.randint(1, 2))
+        text = random.choice(["ping {}", "{} can someone check this?", "hey {} meeting in 5"]).format(" ".join(tags))
+        return [(LABELS[kind], message_update(recorder.next_id(), user, chat, thread, text))]
+
+    if kind == "odg":
+        texts = [f"/odg Benchmark task {n}" for n in range(args.odg_burst - 1)] + ["/odg"]
+        return [(LABELS[kind], message_update(recorder.next_id(), user, chat, thread, text)) for text in texts]
+
+    if kind == "question":
+        text = random.choice(["/question"] + [f"/question {area}" for area in AREAS])
+        return [(LABELS[kind], message_update(recorder.next_id(), user, chat, thread, text))]
+
+    if kind == "poll":
+        return [(LABELS[kind], poll_answer_update(recorder.next_id(), user, random.choice(bot_api.poll_ids[-200:])))]
+
+    return [(LABELS[kind], message_update(recorder.next_id(), user, chat, thread, f"/qr https://eagletrt.it/{random.getrandbits(32):x}"))]
+
+async def replay(application: Application, recorder: Recorder, bot_api: FakeBotAPI, nocodb: FakeNocoDB, args: argparse.Namespace) -> None:
+    """ Enqueue updates at the target rate for the configured duration, open loop. """
+
+    kinds, weights = zip(*args.mix.items())
+    start = time.perf_counter()
+    sent = 0
+
+    while (elapsed := time.perf_counter() - start) < args.duration:
+        # Keep to the schedule even when the application falls behind, so a slow build shows up as latency
+        due = sent / args.rate
+        if due > elapsed:
+            await asyncio.sleep(due - elapsed)
+
+        for label, data in generate(random.choices(kinds, weights)[0], recorder, bot_api, nocodb, args):
+            recorder.sent_now(data["update_id"], label)
+            await application.update_queue.put(Update.de_json(data, application.bot))
+            sent += 1
+
+def report(recorder: Recorder, servers: list) -> dict:
+    """ Print throughput and latency percentiles per handler and return them as a dict. """
+
+    # Throughput over the whole run: from the first update enqueued to the last one finished
+    first = min(sent_at for _, sent_at in recorder.sent.values())
+    last = max(recorder.sent[update_id][1] + latency for update_id, latency in recorder.done.items())
+    elapsed = max(last - first, 1e-9)
+
+    by_label: dict[str, list[float]] = {}
+    for update_id, latency in recorder.done.items():
+        by_label.setdefault(recorder.sent[update_id][0], []).append(latency)
+    errors: dict[str, int] = {}
+    for update_id in recorder.errors:
+        errors[recorder.sent[update_id][0]] = errors.get(recorder.sent[update_id][0], 0) + 1
+
+    results = {
+        "throughput": round(len(recorder.done) / elapsed, 1),
+        "sent": len(recorder.sent),
+        "finished": len(recorder.done),
+        "handlers": {}
+    }
+
+    print(f"\n{len(recorder.done)}/{len(recorder.sent)} updates finished in {elapsed:.1f}s: {results['throughput']} updates/s\n")
+    print(f"{'handler':<14}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, latencies in sorted(by_label.items()):
+        latencies.sort()
+        stats = {
+            "count": len(latencies),
+            "errors": errors.get(label, 0),
+            "p50": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99": round(percentile(latencies, 0.99) * 1000, 1),
+            "max": round(latencies[-1] * 1000, 1)
+        }
+        results["handlers"][label] = stats
+        print(f"{label:<14}{stats['count']:>8}{stats['errors']:>8}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}{stats['max']:>10}")
+
+    print("\n" + "  ".join(f"{server.name}: {server.requests} requests, {server.failures} injected failures" for server in servers))
+    return results
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    """ Print every handler whose p95 grew by more than tolerance over the baseline run; returns whether none did. """
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for label, stats in results["handlers"].items():
+        before = baseline.get("handlers", {}).get(label)
+        if before and stats["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95']} ms -> {stats['p95']} ms")
+
+    if regressions:
+        print(f"\nRegressions over {baseline_path} (tolerance {tolerance:.0%}):\n  " + "\n  ".join(regressions))
+    else:
+        print(f"\nNo p95 regression over {baseline_path} (tolerance {tolerance:.0%}).")
+    return not regressions
+
+async def run(args: argparse.Namespace) -> bool:
+    """ Start the stand-ins and the application, replay the stream, drain it and report; returns whether the baseline check passed. """
+
+    # Base latency in seconds plus up to args.jitter times as much again
+    def latency(ms: float) -> dict:
+        return {"latency": ms / 1000, "jitter": ms * args.jitter / 1000}
+
+    bot_api = FakeBotAPI(failure_rate=args.telegram_failure_rate, failure_status=500, **latency(args.telegram_latency))
+    nocodb = FakeNocoDB(TABLES, members=args.members, failure_rate=args.backend_failure_rate, **latency(args.backend_latency))
+    eagle = FakeEagleAPI(failure_rate=args.backend_failure_rate, **latency(args.backend_latency))
+    shlink = FakeShlink(failure_rate=args.backend_failure_rate, **latency(args.backend_latency))
+    servers = [bot_api, nocodb, eagle, shlink]
+    for server in servers:
+        await server.start()
+
+    # Every file the bot writes goes to a throwaway directory; the API keys only need to be set
+    workdir = tempfile.mkdtemp(prefix="eagle-bench-")
+    os.environ["CONFIG_PATH"] = write_config(workdir, nocodb, eagle, shlink, args)
+    os.environ.setdefault("NOCO_API_KEY", "benchmark")
+    os.environ.setdefault("SHLINK_API_KEY", "benchmark")
+
+    config = load_config()
+    setup_logging(config)
+    tracing.SLOW_CALL_MS = 10 ** 9
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+
+    application = build_application(config, TOKEN, base_url=f"{bot_api.url}/bot")
+    recorder = Recorder()
+    application.add_handler(TypeHandler(Update, recorder.finished), group=99)
+    application.add_error_handler(recorder.failed)
+
+    await seed_quiz(args.questions)
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+
+    # The auth gate lets messages through once the first whitelist refresh from the stand-in has landed
+    whitelist = application.bot_data["whitelist"]
+    deadline = time.perf_counter() + args.drain_timeout
+    while not whitelist.members_cache("@everyone"):
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"the whitelist was not loaded from the NocoDB stand-in within {args.drain_timeout:g}s")
+        await asyncio.sleep(0.05)
+
+    print(f"Replaying {args.rate:g} updates/s for {args.duration:g}s, mix {args.mix}, logs in {workdir}")
+    await replay(application, recorder, bot_api, nocodb, args)
+
+    deadline = time.perf_counter() + args.drain_timeout
+    while recorder.pending and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    if recorder.pending:
+        print(f"{recorder.pending} updates were still pending after {args.drain_timeout:g}s")
+
+    await application.stop()
+    await application.shutdown()
+    await application.post_shutdown(application)
+    for server in servers:
+        server.close()
+
+    if not recorder.done:
+        print("No update finished; check the logs.")
+        return False
+
+    results = report(recorder, servers)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return compare(results, args.baseline, args.tolerance) if args.baseline else True
+
+def parse_mix(value: str) -> dict[str, float]:
+    """ Parse 'mention=4,odg=1,...' into stream weights. """
+
+    mix = {}
+    for item in value.split(","):
+        kind, _, weight = item.partition("=")
+        if kind.strip() not in LABELS:
+            raise argparse.ArgumentTypeError(f"unknown stream '{kind}', expected one of {', '.join(LABELS)}")
+        mix[kind.strip()] = float(weight or 1)
+    return {kind: weight for kind, weight in mix.items() if weight > 0}
+
+def main() -> None:
+    """ Parse the command line and run the benchmark. """
+
+    parser = argparse.ArgumentParser(description="Replay synthetic updates against the bot with local stand-ins for every backend.")
+    parser.add_argument("--rate", type=float, default=50, help="updates enqueued per second (default 50)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of replay (default 30)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("mention=4,odg=1,question=2,poll=3"), help="stream weights among mention, odg, question, poll, qr (default mention=4,odg=1,question=2,poll=3)")
+    parser.add_argument("--odg-burst", type=int, default=5, help="updates per /odg burst in one thread (default 5)")
+    parser.add_argument("--members", type=int, default=200, help="members in the NocoDB stand-in (default 200)")
+    parser.add_argument("--questions", type=int, default=300, help="quiz questions seeded (default 300)")
+    parser.add_argument("--concurrent-updates", type=int, default=8, help="[Settings] ConcurrentUpdates of the application (default 8)")
+    parser.add_argument("--telegram-latency", type=float, default=30, help="Bot API stand-in latency in ms (default 30)")
+    parser.add_argument("--telegram-failure-rate", type=float, default=0, help="fraction of Bot API calls failing with 500 (default 0)")
+    parser.add_argument("--backend-latency", type=float, default=50, help="NocoDB, EagleAPI and Shlink stand-in latency in ms (default 50)")
+    parser.add_argument("--backend-failure-rate", type=float, default=0, help="fraction of backend calls failing with 503 (default 0)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="extra uniform latency, as a fraction of the base latency (default 0.5)")
+    parser.add_argument("--drain-timeout", type=float, default=30, help="seconds to wait for pending updates after the replay (default 30)")
+    parser.add_argument("--seed", type=int, default=None, help="random seed, for comparable runs")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run; exit with status 1 if a handler's p95 regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth over the baseline (default 0.2)")
+    args = parser.parse_args()
+
+    if not args.mix:
+        parser.error("--mix needs at least one stream with a positive weight")
+    random.seed(args.seed)
+
+    if not asyncio.run(run(args)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import html
+import logging
+from modules.profiler import profile, memory_diff, memory_stop, MAX_PROFILE_SECONDS
+from telegram import Update
+from telegram.ext import ContextTypes
+
+USAGE = (
+    "<b>Usage:</b>\n"
+    f"<code>/debug profile [seconds]</code> - sample every thread for up to {MAX_PROFILE_SECONDS}s (default 10s)\n"
+    "<code>/debug mem</code> - tracemalloc diff since the previous call (the first call starts tracing)\n"
+    "<code>/debug mem stop</code> - stop tracemalloc\n"
+    "<code>/debug loop</code> - event-loop lag and asyncio tasks"
+)
+
+async def debug(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Runtime diagnostics for admins: sampling profile, memory diff and event-loop lag."""
+
+    # The caller was already checked by the auth gate (modules/auth)
+    username = update.effective_user.username
+
+    # Remove bot mention if present and trim whitespace
+    text = update.message.text
+    text = text.replace("@eagletrtbot", "").strip()
+    args = text.split()[1:]
+
+    if not args:
+        await update.message.reply_html(USAGE)
+        return
+
+    if args[0] == "profile":
+        seconds = int(args[1]) if len(args) > 1 and args[1].isdigit() else 10
+        logging.info(f"commands/debug - User @{username} started a {seconds}s profile")
+        await update.message.reply_text(f"Profiling for {min(seconds, MAX_PROFILE_SECONDS)}s...")
+        report = await profile(seconds)
+        await update.message.reply_document(document=report, filename="profile.txt")
+
+    elif args[0] == "mem":
+        logging.info(f"commands/debug - User @{username} requested a memory diff")
+        result = memory_stop() if len(args) > 1 and args[1] == "stop" else memory_diff()
+        await update.message.reply_html(f"<pre>{html.escape(result)}</pre>")
+
+    elif args[0] == "loop":
+        logging.info(f"commands/debug - User @{username} requested the event-loop report")
+        await update.message.reply_html(f"<pre>{html.escape(context.bot_data['loop_monitor'].report())}</pre>")
+
+    else:
+        await update.message.reply_html(USAGE)
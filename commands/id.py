@@ -5,21 +5,8 @@ from telegram.ext import ContextTypes
 async def id(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Sends a greeting and logs who started the bot."""
 
-    # Check if the command is used in a message context
-    if update.edited_message or update.message_reaction:
-        return
-
-    # Ensure the user has a Telegram username
+    # The caller was already checked by the auth gate (modules/auth)
     username = update.effective_user.username
-    if not username:
-        logging.warning("commands/id - User without username attempted to use /id command")
-        await update.message.reply_html("You need a Telegram username to use this command.")
-        return
-    
-    # Whitelist check
-    if context.bot_data['config']['Features']['Whitelist'] and not context.bot_data['whitelist'].is_user_whitelisted(username, context.bot_data['config']['Whitelist']['General']):
-        logging.warning(f"commands/id - Unauthorized /id attempt by @{username}")
-        return
 
     logging.info(f"commands/id - /id command used by @{username}")
     
@@ -1,81 +1,50 @@
 import logging
-import re
-import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
 
 async def mention_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handles mentions of tags and replies with member lists."""
 
-    # Check if the command is used in a message context
-    if update.edited_message or update.message_reaction:
-        return
-    
-    # Ensure the user has a Telegram username
+    # The caller was already checked by the auth gate (modules/auth)
     username = update.effective_user.username
-    if not username:
-        logging.warning("commands/mentions - User without username attempted to use mention handler")
-        return
 
     # Guard: skip if there's no text
     msg = update.message
     if not msg or (not msg.text and not msg.caption):
         logging.info(f"commands/mentions - Message from @{username} has no text or caption to process.")
         return
-    
-    # Find all mentions like @username or @tag (letters, digits, underscore, dot, hyphen allowed)
-    text = msg.text.lower() if msg.text else msg.caption.lower()
-    found_tags = set(re.findall(r'@[\w\.-]+', text))
-    if not found_tags:
-        return
-    
-    # Whitelist check
-    if context.bot_data['config']['Features']['Whitelist'] and not context.bot_data['whitelist'].is_user_whitelisted(username, context.bot_data['config']['Whitelist']['General']):
-        logging.warning(f"commands/mentions - Unauthorized /mentions attempt by @{username}")
-        return
 
-    # Load NocoDB and tag cache from bot data
-    nocodb = context.bot_data["nocodb"]
-    tag_cache = context.bot_data["tag_cache"]
+    # Resolve the known tags mentioned in the message to their kind with the precompiled matcher;
+    # messages without an '@' are rejected before any regex work
     whitelist = context.bot_data["whitelist"]
+    found_tags = whitelist.matcher.scan(msg.text or msg.caption)
+    if not found_tags:
+        return
 
     message = ""
     temp_message = None
 
-    if "@inlab" in found_tags and context.bot_data['config']['Features']['EAgleAPIIntegration']:
+    if "@inlab" in found_tags and context.bot_data['config']['Features']['EAgleAPIIntegration'] and not context.bot_data["presence"].fresh:
         temp_message = await update.message.reply_html("Dame n’atimo che i cato fora")
 
     # Iterate found tags and handle each; replies the list of members for matched tags
-    for tag in found_tags:
-        tag_name = tag[1:] # Remove '@'
-
-        if tag_name == "inlab":
+    for tag, kind in found_tags.items():
+        if kind == "inlab":
 
             # Check if EagleAPI integration is enabled
             if not context.bot_data['config']['Features']['EAgleAPIIntegration']:
                 logging.warning(f"commands/mentions - EagleAPI integration is disabled; cannot process @inlab request from @{username}")
                 return
             
-            # Load the EagleAPI from bot data
-            eagle_api = context.bot_data["eagle_api"]
-
-            # Call EagleAPI client; expected structure: {'people': [emails], 'count': n}
-            inlab_data = eagle_api.inlab()
-
-            # Convert emails to NocoDB usernames/tags using the nocodb helper
-            tags = await asyncio.gather(*[
-                nocodb.username_from_email(email)
-                for email in inlab_data['people']
-            ])
+            # Shared, short-lived result: {'count': n, 'people': [emails], 'usernames': [tags]}
+            inlab_data = await context.bot_data["presence"].get()
 
             if inlab_data['count'] == 0:
                 members = []
             else:
-                members = tags
-        elif tag in tag_cache['areas'] or tag in tag_cache['workgroups'] or tag in tag_cache['projects'] or tag in tag_cache['roles']:
-            members = whitelist.members_cache(tag)
+                members = inlab_data['usernames']
         else:
-            members = None
+            members = whitelist.members_cache(tag)
 
         logging.info(f"commands/mentions - User @{username} requested correctly members for tag {tag}: {members}")
 
@@ -1,25 +1,13 @@
 import logging
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
 
 async def qr(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """ Generates a shlink QR code and sends it to the user. """
 
-    # Check if the command is used in a message context
-    if update.edited_message or update.message_reaction:
-        return
-
-    # Ensure the user has a Telegram username
+    # The caller was already checked by the auth gate (modules/auth)
     username = update.effective_user.username
-    if not username:
-        logging.warning("commands/qr - User without username attempted to use /qr command")
-        await update.message.reply_html("You need a Telegram username to use this command.")
-        return
-    
-    # Whitelist check
-    if context.bot_data['config']['Features']['Whitelist'] and not context.bot_data['whitelist'].is_user_whitelisted(username, context.bot_data['config']['Whitelist']['General']):
-        logging.warning(f"commands/qr - Unauthorized /qr attempt by @{username}")
-        return
     
     # Check if the command is used in a group where QR codes are allowed
     chat_id = str(update.effective_chat.id)
@@ -52,8 +40,8 @@ async def qr(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     try:
         # Generate short URL and QR code
-        short_url = shlink.generate_short_url(url, code)
-        qr_image = shlink.generate_qr_code(short_url)
+        short_url = await shlink.generate_short_url(url, code)
+        qr_image = await asyncio.to_thread(shlink.generate_qr_code, short_url)
 
         logging.info(f"commands/qr - Successfully generated QR code for user @{username} with URL: {short_url}")
         await update.message.reply_photo(qr_image, caption=f"Here is your short URL: {short_url}")
@@ -1,8 +1,7 @@
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
-from pony.orm import db_session
-from modules.quiz import Polls
+from modules.quiz import get_poll
 
 async def question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """ Handles answers to quiz questions. """
@@ -12,17 +11,16 @@ async def question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user = answer.user
 
     # Retrieve the options from your stored poll data
-    with db_session:
-        options = Polls.get(poll_id=poll_id)
-        if options is None:
-            logging.warning(f"commands/question - Received answer for unknown poll ID {poll_id} from user @{user.username}")
-            return
-        options = {
-            "question_id": options.question.id,
-            "quiz_id": options.question.quiz.quiz_id,
-            "correct_option": options.correct_option,
-            "areas": options.question.areas
-        }
+    poll = await get_poll(poll_id)
+    if poll is None:
+        logging.warning(f"commands/question - Received answer for unknown poll ID {poll_id} from user @{user.username}")
+        return
+    options = {
+        "question_id": poll.question_id,
+        "quiz_id": poll.quiz_id,
+        "correct_option": poll.correct_option,
+        "areas": poll.areas
+    }
 
     # Check if the user retracted their vote
     if not answer.option_ids:
@@ -33,12 +31,13 @@ async def question_answer(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     selected_option = answer.option_ids[0]
     correct_option = options['correct_option']
     
-    nocodb = context.bot_data['nocodb']
+    # Answers are aggregated in memory and written to NocoDB in batches
+    quiz_log = context.bot_data['quiz_log']
     if selected_option == correct_option:
         logging.info(f"commands/question - User @{user.username} answered correctly for question {options['question_id']}-{options['quiz_id']} | ({options['areas']})")
-        await nocodb.quiz_answer_log(user.username, True)
+        quiz_log.add(user.username, True)
     else:
         logging.info(f"commands/question - User @{user.username} answered incorrectly for question {options['question_id']}-{options['quiz_id']} | ({options['areas']})")
-        await nocodb.quiz_answer_log(user.username, False)
+        quiz_log.add(user.username, False)
 
     return
\ No newline at end of file
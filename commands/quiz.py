@@ -1,27 +1,13 @@
 import logging
-from pony.orm import db_session
-from modules.quiz import Quiz
+from modules.quiz import get_quiz
 from telegram import Update
 from telegram.ext import ContextTypes
 
 async def quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Fetches and displays details for a specific quiz."""
 
-    # Check if the command is used in a message context
-    if update.edited_message or update.message_reaction:
-        return
-    
-    # Ensure the user has a Telegram username
+    # The caller was already checked by the auth gate (modules/auth)
     username = update.effective_user.username
-    if not username:
-        logging.warning("commands/quiz - User without username attempted to use /quiz command")
-        await update.message.reply_html("You need a Telegram username to use this command.")
-        return
-    
-    # Whitelist check
-    if context.bot_data['config']['Features']['Whitelist'] and not context.bot_data['whitelist'].is_user_whitelisted(username, context.bot_data['config']['Whitelist']['Quiz']):
-        logging.warning(f"commands/quiz - Unauthorized /quiz attempt by @{username}")
-        return
     
     # Remove bot mention if present and trim whitespace
     text = update.message.text
@@ -35,12 +21,11 @@ async def quiz(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     
     # Fetch the quiz from the database and reply with its details
-    with db_session:
-        quiz_entity = Quiz.get(quiz_id=id)
-        if not quiz_entity:
-            logging.info(f"commands/quiz - Quiz with ID {id} not found for user @{username}")
-            await update.message.reply_html(f"Quiz with ID {id} not found.")
-            return
+    quiz_entity = await get_quiz(id)
+    if not quiz_entity:
+        logging.info(f"commands/quiz - Quiz with ID {id} not found for user @{username}")
+        await update.message.reply_html(f"Quiz with ID {id} not found.")
+        return
     
     logging.info(f"commands/quiz - User @{username} requested correctly details for quiz ID {quiz_entity.quiz_id}")
     await update.message.reply_html(
@@ -5,21 +5,8 @@ from telegram.ext import ContextTypes
 async def tags(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Replies with cached lists of tags."""
 
-    # Check if the command is used in a message context
-    if update.edited_message or update.message_reaction:
-        return
-    
-    # Ensure the user has a Telegram username
+    # The caller was already checked by the auth gate (modules/auth)
     username = update.effective_user.username
-    if not username:
-        logging.warning("commands/tags - User without username attempted to use /tags command")
-        await update.message.reply_html("You need a Telegram username to use this command.")
-        return
-    
-    # Whitelist check
-    if context.bot_data['config']['Features']['Whitelist'] and not context.bot_data['whitelist'].is_user_whitelisted(username, context.bot_data['config']['Whitelist']['General']):
-        logging.warning(f"commands/tags - Unauthorized /tags attempt by @{username}")
-        return
 
     # Access the tag cache from bot_data
     tag_cache = context.bot_data["tag_cache"]
@@ -0,0 +1,38 @@
+import html
+import logging
+from datetime import datetime
+from modules.tracing import slowest
+from telegram import Update
+from telegram.ext import ContextTypes
+
+async def traces(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows the slowest recent outbound HTTP calls and the update that caused each of them."""
+
+    # The caller was already checked by the auth gate (modules/auth)
+    username = update.effective_user.username
+
+    # Remove bot mention if present and trim whitespace
+    text = update.message.text
+    text = text.replace("@eagletrtbot", "").strip()
+
+    # Optional number of traces to show, capped to keep the reply short
+    val = text.split(' ')[1] if ' ' in text else None
+    limit = min(int(val), 30) if val and val.isdigit() and int(val) > 0 else 10
+
+    recent = slowest(limit)
+    if not recent:
+        await update.message.reply_html("No outbound calls traced yet.")
+        return
+
+    lines = []
+    for trace in recent:
+        origin = f"#{trace.update_id} {trace.handler}" if trace.update_id is not None else "background"
+        lines.append(
+            f"{trace.duration_ms:>8.1f} ms {trace.method} {trace.backend} {trace.path} "
+            f"{trace.status} {trace.bytes} B {datetime.fromtimestamp(trace.started_at):%H:%M:%S} {origin}"
+        )
+
+    logging.info(f"commands/traces - User @{username} requested the {len(recent)} slowest traces")
+    await update.message.reply_html(
+        f"<b>Slowest recent calls</b>\n<pre>{html.escape(chr(10).join(lines))}</pre>"
+    )
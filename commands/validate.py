@@ -0,0 +1,28 @@
+import logging
+from modules.quiz import revalidate, question_index
+from telegram import Update
+from telegram.ext import ContextTypes
+
+async def validate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Revalidates every question in the quiz database and reports the invalid ones."""
+
+    # The caller was already checked by the auth gate (modules/auth)
+    username = update.effective_user.username
+
+    # Recompute the validity columns and rebuild the random question index on top of them
+    invalid = await revalidate()
+
+    logging.info(f"commands/validate - User @{username} revalidated the quiz database: {len(invalid)} invalid questions")
+
+    if not invalid:
+        await update.message.reply_html(f"All questions are valid (<b>{len(question_index.all)}</b> available).")
+        return
+
+    # Keep the reply within Telegram's message length limit
+    invalid_ids = ", ".join(f"{question_id}-{quiz_id}" for question_id, quiz_id in invalid)
+    if len(invalid_ids) > 3500:
+        invalid_ids = invalid_ids[:3500].rsplit(", ", 1)[0] + ", ..."
+    await update.message.reply_html(
+        f"<b>{len(question_index.all)}</b> valid questions, <b>{len(invalid)}</b> invalid:\n{invalid_ids}"
+    )
+    return
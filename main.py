@@ -1,85 +1,87 @@
 import os
 import logging
-import tomllib
-from modules.nocodb import NocoDB
-from modules.api_client import EagleAPI
-from modules.shlink import ShlinkAPI
-from modules.whitelist import Whitelist
+import asyncio
+import signal
+from modules.auth import AuthGate
+from modules.updates import ChatOrderedUpdateProcessor
+from modules.snapshot import load_snapshot
+from modules.config import ConfigError, load_config, reload_config
+from modules.features import register_features
+from modules.logs import ColorFormatter, bind_update, setup_logging
+from modules.http import TelegramRequest
+from modules import metrics, tracing
 from telegram import Update, BotCommand
-from telegram.ext import Application, CommandHandler, MessageHandler, PollAnswerHandler, filters
-from modules.scheduler import setup_scheduler
+from telegram.ext import Application, CommandHandler, TypeHandler
 
-# Import command handlers
+# Import command handlers; feature commands are imported by modules/features only when enabled
 from commands.start import start
-from commands.odg import odg
-from commands.inlab import inlab
-from commands.ore import ore
-from commands.tags import tags
-from commands.mentions import mention_handler
-from commands.qr import qr
-from commands.quiz import quiz
-from commands.quizzes import quizzes
-from commands.event import event
-from commands.events import events
-from commands.question import question
-from commands.question_answer import question_answer
-from commands.answer import answer
-from commands.id import id
-
-# Color codes used for coloring log output in console only
-COLORS = {
-    "INFO": "\033[94m",
-    "WARNING": "\033[33m",
-    "ERROR": "\033[91m",
-    "RESET": "\033[0m"
-}
-
-class ColorFormatter(logging.Formatter):
-    """Custom logging formatter to add colors based on log level."""
-
-    def format(self, record):
-        """Format log messages with colors based on severity level."""
-
-        message = super().format(record)
-        levelname = record.levelname
-        color = COLORS.get(levelname, COLORS["RESET"])
-        start = message.find(f"[{levelname}]")
-        if start != -1:
-            end = start + len(f"[{levelname}]")
-            message = (
-                message[:start]
-                + f"{color}[{levelname}]{COLORS['RESET']}"
-                + message[end:]
-            )
-        return message
 
 # Configure logging to console with colors
 console_handler = logging.StreamHandler()
-console_handler.setFormatter(ColorFormatter("%(asctime)s [%(levelname)s] %(message)s"))
+console_handler.setFormatter(ColorFormatter())
 logging.basicConfig(level=logging.INFO, handlers=[console_handler])
 
 async def ps(application: Application) -> None:
     """Post-initialization hook to set bot commands and start scheduler if enabled."""
 
+    snapshot = {}
+    snapshot_path = application.bot_data["config"]['Paths'].get(
+        'CacheSnapshotPath',
+        os.path.join(os.path.dirname(application.bot_data["config"]['Paths']['DatabasePath']), 'cache.json')
+    )
+
     if application.bot_data["config"]['Features']['NocoDBIntegration']:
-        # Initialize tag cache
-        tag_cache = {
-            "areas": await application.bot_data['nocodb'].tags('area'),
-            "workgroups": await application.bot_data['nocodb'].tags('workgroup'),
-            "projects": await application.bot_data['nocodb'].tags('project'),
-            "roles": await application.bot_data['nocodb'].tags('role')
-        }
-        application.bot_data["tag_cache"] = tag_cache
-        logging.info("main/main - Tag cache initialized.")
+        # Warm-start the tag cache from the last snapshot; the whitelist refresh revalidates it in the background
+        snapshot = load_snapshot(snapshot_path) or {}
+        if snapshot.get("tag_cache"):
+            application.bot_data["tag_cache"] = snapshot["tag_cache"]
+            logging.info("main/main - Tag cache loaded from snapshot.")
+        else:
+            application.bot_data["tag_cache"] = await application.bot_data['nocodb'].tag_cache()
+            logging.info("main/main - Tag cache initialized.")
+
+    if application.bot_data["config"]['Features']['FSQuizLogging'] and application.bot_data["config"]['Features']['FSQuiz'] and application.bot_data["config"]['Features']['NocoDBIntegration']:
+        from modules.quiz_log import QuizAnswerBuffer
+        application.bot_data["quiz_log"] = QuizAnswerBuffer(
+            application.bot_data['nocodb'],
+            interval=application.bot_data["config"]['Settings'].get('QuizLogFlushInterval', 60),
+            batch_size=application.bot_data["config"]['Settings'].get('QuizLogBatchSize', 50)
+        )
+        logging.info("main/main - Quiz answer buffer started.")
+
+    if application.bot_data["config"]['Features']['FSQuiz'] and application.bot_data["config"]['Features'].get('FSQuizImageMirror', False):
+        from modules.image_mirror import ImageMirror
+        image_mirror = ImageMirror(application.bot_data["config"]['Paths']['ImageMirrorPath'])
+        application.bot_data["image_mirror_task"] = asyncio.create_task(image_mirror.run())
+        logging.info("main/main - Quiz image mirror started in background.")
 
     if application.bot_data["config"]['Features']['FSQuizScheduledSends']:
+        from modules.scheduler import setup_scheduler
         setup_scheduler(application)
         logging.info("main/main - Scheduled quiz sends enabled.")
 
     if application.bot_data["config"]['Features']['Whitelist'] and application.bot_data["config"]['Features']['NocoDBIntegration'] and application.bot_data["config"]['Features']['MentionHandler']:
-        application.bot_data["whitelist"] = Whitelist(application)
+        from modules.whitelist import Whitelist
+        application.bot_data["whitelist"] = Whitelist(application, snapshot_path, snapshot.get("whitelist"))
         logging.info("main/main - Whitelist feature enabled.")
 
+    # Serve the Prometheus metrics on a local listener
+    if application.bot_data["config"].get('Metrics', {}).get('Enabled', False):
+        application.bot_data["metrics_server"] = await metrics.serve(
+            application.bot_data["config"]['Metrics'].get('Listen', '127.0.0.1'),
+            application.bot_data["config"]['Metrics'].get('Port', 9090)
+        )
+
+    # Start measuring event-loop lag for /debug loop
+    if "loop_monitor" in application.bot_data:
+        application.bot_data["loop_monitor"].start()
+
+    # Reload config.ini on SIGHUP (not available on Windows)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload, application)
+    except (AttributeError, NotImplementedError):
+        logging.warning("main/main - SIGHUP config reload is not supported on this platform.")
+
     commands = []
 
     # Conditional addition of mention handler command
@@ -109,125 +111,159 @@ async def ps(application: Application) -> None:
 
     await application.bot.set_my_commands(commands)
 
-def main() -> None:
-    """Main function to set up and run the bot."""
+def reload(application: Application) -> None:
+    """SIGHUP handler: reload config.ini and apply the sections that can change without a restart."""
 
-    # Validate environment variables
-    required_vars = ["TELEGRAM_BOT_TOKEN", "NOCO_API_KEY", "SHLINK_API_KEY", "CONFIG_PATH"]
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
-    if missing_vars:
-        if "TELEGRAM_BOT_TOKEN" in missing_vars:
-            logging.error("main/main - TELEGRAM_BOT_TOKEN environment variable is required but not set.")
-            exit(1)
-        if "CONFIG_PATH" in missing_vars:
-            logging.error("main/main - CONFIG_PATH environment variable is required but not set.")
-            exit(1)
-        if "NOCO_API_KEY" in missing_vars and config['Features']['NocoDBIntegration']:
-            logging.error("main/main - NOCO_API_KEY environment variable is required but not set.")
-            exit(1)
-        if "SHLINK_API_KEY" in missing_vars and config['Features']['QRcodeGenerator']:
-            logging.error("main/main - SHLINK_API_KEY environment variable is required but not set.")
-            exit(1)
-
-    # Load configuration from config.ini
-    with open(os.getenv("CONFIG_PATH"), "rb") as f:
-        try:
-            config = tomllib.load(f)
-        except tomllib.TOMLDecodeError as e:
-            logging.error(f"main/main - Error parsing data/config.ini: {e}")
-            exit(1)
-
-    # Configure logging from config file
-    log_level_console = config["Settings"]["ConsoleLogLevel"]
-    log_level_file = config["Settings"]["FileLogLevel"]
-    log_file_path = config["Paths"]["LogFilePath"]
-
-    # Get the root logger and set its level
-    root_logger = logging.getLogger()
-    root_logger.setLevel(getattr(logging, log_level_console))
-
-    # Add file handler
-    file_handler = logging.FileHandler(log_file_path, mode="a", encoding="utf-8")
-    file_handler.setLevel(getattr(logging, log_level_file))
-    file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-    root_logger.addHandler(file_handler)
+    try:
+        old, new = reload_config()
+    except ConfigError as e:
+        logging.error(f"main/main - Config reload failed, keeping the current configuration: {e}")
+        return
 
-    # Remove verbose logs (PTB)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("telegram").setLevel(logging.WARNING)
-    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+    # Runs on the event loop without awaiting, so no handler ever sees a half-applied reload
+    application.bot_data["config"] = new
+
+    # QR groups are read from bot_data["config"] on every /qr, so swapping the config is enough for them
+    if "areas" in application.bot_data and new['Settings']['areas'] != old['Settings']['areas']:
+        application.bot_data["areas"] = new['Settings']['areas']
+        logging.info("main/main - Quiz areas reloaded.")
+
+    if "whitelist" in application.bot_data and new['Whitelist'] != old['Whitelist']:
+        application.bot_data["whitelist"].reconfigure(new)
+
+    if "question_scheduler" in application.bot_data and new.get('ScheduledQuestions') != old.get('ScheduledQuestions'):
+        from modules.scheduler import reschedule
+        reschedule(application)
+
+    # Everything else is wired at startup
+    restart_only = [
+        section for section in ("Features", "Paths", "Webhook", "Metrics", "NocoDB")
+        if new.get(section) != old.get(section)
+    ]
+    if {key: value for key, value in new['Settings'].items() if key != 'areas'} != {key: value for key, value in old['Settings'].items() if key != 'areas'}:
+        restart_only.append("Settings")
+    if restart_only:
+        logging.warning(f"main/main - Changes to {', '.join(restart_only)} take effect after a restart.")
+
+    logging.info("main/main - Configuration reloaded.")
+
+async def shutdown(application: Application) -> None:
+    """Post-shutdown hook to drain buffered state before exiting."""
+
+    if "quiz_log" in application.bot_data:
+        await application.bot_data["quiz_log"].close()
+        logging.info("main/main - Quiz answer buffer drained.")
+
+    if "loop_monitor" in application.bot_data:
+        application.bot_data["loop_monitor"].stop()
+
+    if "metrics_server" in application.bot_data:
+        application.bot_data["metrics_server"].close()
 
-    application = (
+    # Close the pooled HTTP clients
+    for client in ("nocodb", "eagle_api", "shlink_api"):
+        if client in application.bot_data:
+            await application.bot_data[client].aclose()
+
+def build_application(config, token: str, base_url: str = None) -> Application:
+    """Build the application with every handler registered; base_url points the Bot API client elsewhere (e.g. the benchmark stand-in)."""
+
+    builder = (
         Application.builder()
-        .token(os.getenv("TELEGRAM_BOT_TOKEN"))
+        .token(token)
         .post_init(ps)
-        .read_timeout(30)
-        .write_timeout(30)
-        .build()
+        .post_shutdown(shutdown)
+        # Bot API calls go through an instrumented request backend (same pool size as PTB's default one)
+        .request(TelegramRequest(connection_pool_size=256, read_timeout=30, write_timeout=30))
     )
+    if base_url:
+        builder = builder.base_url(base_url)
 
-    logging.info("main/main - T.E.C.S. started")
+    # Process updates concurrently, keeping each chat/thread in order, unless configured to run them one by one
+    concurrent_updates = config['Settings'].get('ConcurrentUpdates', 8)
+    if concurrent_updates > 1:
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(concurrent_updates))
+
+    application = builder.build()
 
     # Store config in bot_data for global access
     application.bot_data["config"] = config
 
-    # Initialize NocoDB client if enabled
-    if config['Features']['NocoDBIntegration']:
-        nocodb = NocoDB(config['Settings']['NOCO_URL'], os.getenv("NOCO_API_KEY"))
-        application.bot_data["nocodb"] = nocodb
-        logging.info("main/main - NocoDB integration enabled.")
+    # Tag the log records of every update with its handler, user, chat and latency
+    application.add_handler(TypeHandler(Update, bind_update), group=-2)
+
+    # Pre-dispatch auth in an earlier group: it stops edits, users without a username and non-whitelisted callers before any handler runs
+    auth_gate = AuthGate(config['Features']['Whitelist'])
+    application.add_handler(TypeHandler(Update, auth_gate.check), group=-1)
 
     # Register handlers
     application.add_handler(CommandHandler("start", start))
 
-    # Conditional registration of mention handler and /tags command
-    if config['Features']['MentionHandler'] and config['Features']['NocoDBIntegration'] and config['Features']['Whitelist']:
-        application.add_handler(CommandHandler("tags", tags))
-        application.add_handler(MessageHandler((filters.TEXT | filters.CAPTION) & ~filters.COMMAND, mention_handler))
-        logging.info("main/main - Mention handler and /tags command enabled and handlers registered.")
-
-    # Conditional registration of info command
-    if config['Features']['IDCommand']:
-        application.add_handler(CommandHandler("id", id))
-        logging.info("main/main - Info command enabled and handler registered.")
-
-    # Conditional registration of ODG command
-    if config['Features']['ODGCommand']:
-        application.add_handler(CommandHandler("odg", odg))
-        logging.info("main/main - ODG command enabled and handler registered.")
-
-    # Conditional registration of Eagle API handlers
-    if config['Features']['EAgleAPIIntegration']:
-        eagle_api = EagleAPI(config['Settings']['EAGLE_API_URL'])
-        application.bot_data["eagle_api"] = eagle_api
-        application.add_handler(CommandHandler("inlab", inlab))
-        application.add_handler(CommandHandler("ore", ore))
-        logging.info("main/main - Eagle API integration enabled and handlers registered.")
-
-    # Conditional registration of QR code generator handler
-    if config['Features']['QRcodeGenerator']:
-        shlink_api = ShlinkAPI(config['Settings']['SHLINK_API_URL'], os.getenv("SHLINK_API_KEY"))
-        application.bot_data["shlink_api"] = shlink_api
-        application.add_handler(CommandHandler("qr", qr))
-        logging.info("main/main - QR code generator feature enabled and handler registered.")
-
-    # Conditional registration of quiz-related handlers
-    if config['Features']['FSQuiz']:
-        application.add_handler(CommandHandler("question", question))
-        application.add_handler(CommandHandler("quiz", quiz))
-        application.add_handler(CommandHandler("quizzes", quizzes))
-        application.add_handler(CommandHandler("event", event))
-        application.add_handler(CommandHandler("events", events))
-        application.add_handler(CommandHandler("answer", answer))
-        application.bot_data["areas"] = config['Settings']['areas']
-        logging.info("main/main - Quiz feature enabled and handler registered.")
-
-    if config['Features']['FSQuizLogging'] and config['Features']['FSQuiz'] and config['Features']['NocoDBIntegration']:
-        application.add_handler(PollAnswerHandler(question_answer))
-        logging.info("main/main - Quiz logging enabled and handlers registered.")
-
-    # Start polling
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    # Import and register only the enabled features
+    register_features(application, config)
+
+    # Time every registered handler for the metrics endpoint
+    metrics.instrument_handlers(application)
+
+    return application
+
+def main() -> None:
+    """Main function to set up and run the bot."""
+
+    # Validate environment variables
+    required_vars = ["TELEGRAM_BOT_TOKEN", "NOCO_API_KEY", "SHLINK_API_KEY", "CONFIG_PATH"]
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    if "TELEGRAM_BOT_TOKEN" in missing_vars:
+        logging.error("main/main - TELEGRAM_BOT_TOKEN environment variable is required but not set.")
+        exit(1)
+    if "CONFIG_PATH" in missing_vars:
+        logging.error("main/main - CONFIG_PATH environment variable is required but not set.")
+        exit(1)
+
+    # Load, validate and freeze the configuration once; every module shares this object
+    try:
+        config = load_config()
+    except ConfigError as e:
+        logging.error(f"main/main - Invalid configuration in {os.getenv('CONFIG_PATH')}: {e}")
+        exit(1)
+
+    if "NOCO_API_KEY" in missing_vars and config['Features']['NocoDBIntegration']:
+        logging.error("main/main - NOCO_API_KEY environment variable is required but not set.")
+        exit(1)
+    if "SHLINK_API_KEY" in missing_vars and config['Features']['QRcodeGenerator']:
+        logging.error("main/main - SHLINK_API_KEY environment variable is required but not set.")
+        exit(1)
+
+    # Configure logging from config file: records are queued and written by a background thread
+    setup_logging(config)
+
+    # Threshold above which outbound HTTP calls are logged as slow
+    tracing.SLOW_CALL_MS = config['Settings'].get('SlowCallMs', 1000)
+
+    # Remove verbose logs (PTB)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("telegram").setLevel(logging.WARNING)
+    logging.getLogger("apscheduler").setLevel(logging.WARNING)
+
+    application = build_application(config, os.getenv("TELEGRAM_BOT_TOKEN"))
+
+    logging.info("main/main - T.E.C.S. started")
+
+    webhook = config.get('Webhook', {})
+    if webhook.get('Enabled', False):
+        # Receive updates on a local HTTP listener; a reverse proxy terminates TLS and forwards to it
+        logging.info(f"main/main - Webhook mode: listening on {webhook.get('Listen', '127.0.0.1')}:{webhook.get('Port', 8080)}")
+        application.run_webhook(
+            listen=webhook.get('Listen', '127.0.0.1'),
+            port=webhook.get('Port', 8080),
+            url_path=webhook.get('Path', 'telegram'),
+            webhook_url=webhook['URL'],
+            secret_token=os.getenv("WEBHOOK_SECRET_TOKEN"),
+            allowed_updates=Update.ALL_TYPES
+        )
+    else:
+        # Start polling
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == "__main__":
     main()
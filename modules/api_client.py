@@ -1,37 +1,42 @@
-import requests
+from modules.http import new_client
 
 class EagleAPI:
-    """ Simple API client that keeps a persistent requests.Session. """
+    """ Simple async API client that keeps a persistent pooled httpx.AsyncClient. """
     def __init__(self, base_url: str,):
         """ Initialize the EagleAPI client with the given base URL. """
 
         # Normalize base_url by removing any trailing slash so later joins are consistent
         self.base_url = base_url.rstrip("/")
 
-        # Create a Session to reuse TCP connections and carry default headers/cookies
-        self._session = requests.Session()
-
-        # Set default headers for JSON APIs. Individual requests can override this.
-        self._session.headers.update({
+        # Create a pooled client to reuse TCP connections and carry default headers.
+        # Individual requests can override these headers.
+        self._session = new_client("eagle_api", headers={
             'Content-Type': 'application/json'
         })
 
-    def oreLab(self, username: str) -> dict:
+    async def oreLab(self, username: str) -> dict:
         """ Call the ore lab endpoint for a given username. """
 
         # Perform the GET request with the username as a query parameter
-        res = self._session.get(f"{self.base_url}/lab/ore", params={
+        res = await self._session.get(f"{self.base_url}/lab/ore", params={
             "username": username
         })
+        res.raise_for_status()
 
         # Parse and return JSON body (may raise if response is not JSON)
         return res.json()
 
-    def inlab(self) -> dict:
+    async def inlab(self) -> dict:
         """ Call the inlab endpoint. """
 
         # Call the endpoint without query parameters
-        res = self._session.get(f"{self.base_url}/lab/inlab")
+        res = await self._session.get(f"{self.base_url}/lab/inlab")
+        res.raise_for_status()
 
         # Return parsed JSON result
         return res.json()
+
+    async def aclose(self) -> None:
+        """ Close the underlying connection pool. """
+
+        await self._session.aclose()
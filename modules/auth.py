@@ -0,0 +1,99 @@
+import logging
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+from modules.metrics import cache_lookup
+
+# Permission group in [Whitelist] required by every command
+COMMAND_GROUPS = {
+    "start": "General",
+    "tags": "General",
+    "id": "General",
+    "odg": "General",
+    "inlab": "General",
+    "ore": "General",
+    "qr": "General",
+    "question": "General",
+    "quiz": "Quiz",
+    "quizzes": "Quiz",
+    "event": "Quiz",
+    "events": "Quiz",
+    "answer": "Quiz",
+    "validate": "Quiz",
+    "traces": "Quiz",
+    "debug": "Quiz"
+}
+
+# Permission group required for plain messages, which only reach the mention handler
+MESSAGE_GROUP = "General"
+
+class AuthGate:
+    """ Pre-dispatch check run before every handler: drops edits, requires a username and enforces the whitelist. """
+
+    def __init__(self, whitelist_enabled: bool):
+        """ Initialize the gate; with the whitelist disabled only the edit and username checks apply. """
+
+        self.whitelist_enabled = whitelist_enabled
+        self._generation = None  # Whitelist generation the cached decisions were computed against
+        self._decisions: dict[str, frozenset[str]] = {}  # Lowercased username -> permission groups the user belongs to
+
+    @staticmethod
+    def _command(update: Update) -> str | None:
+        """ Return the command name of a command message, without the leading '/' and the bot mention. """
+
+        text = update.message.text if update.message else None
+        if not text or not text.startswith("/"):
+            return None
+        return text.split(maxsplit=1)[0][1:].split("@", 1)[0].lower()
+
+    def _groups(self, whitelist, username: str) -> frozenset[str]:
+        """ Return the permission groups of a user, cached until the whitelist is refreshed. """
+
+        if whitelist.generation != self._generation:
+            self._decisions = {}
+            self._generation = whitelist.generation
+
+        key = username.lower()
+        groups = self._decisions.get(key)
+        cache_lookup("auth", groups is not None)
+        if groups is None:
+            groups = frozenset(group for group in whitelist.group_config if whitelist.is_user_allowed(key, group))
+            self._decisions[key] = groups
+        return groups
+
+    async def check(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """ Stop the update with ApplicationHandlerStop unless the caller may reach the handlers. """
+
+        # Edits and reactions are never handled
+        if update.edited_message or update.message_reaction:
+            raise ApplicationHandlerStop
+
+        # Poll answers carry no chat message; question_answer looks the poll up itself
+        if update.poll_answer or not update.message or not update.effective_user:
+            return
+
+        command = self._command(update)
+        username = update.effective_user.username
+
+        # Ensure the user has a Telegram username
+        if not username:
+            if command in COMMAND_GROUPS:
+                logging.warning(f"modules/auth - User without username attempted to use /{command} command")
+                await update.message.reply_html("You need a Telegram username to use this command.")
+            raise ApplicationHandlerStop
+
+        if not self.whitelist_enabled:
+            return
+
+        # Unknown commands reach no handler, so there is nothing to protect
+        if command is not None and command not in COMMAND_GROUPS:
+            return
+
+        group = COMMAND_GROUPS[command] if command else MESSAGE_GROUP
+        whitelist = context.bot_data.get('whitelist')
+        if whitelist is not None and group in self._groups(whitelist, username):
+            return
+
+        # Plain messages from outsiders are frequent in groups, so only commands are logged
+        if command:
+            logging.warning(f"modules/auth - Unauthorized /{command} attempt by @{username}")
+        raise ApplicationHandlerStop
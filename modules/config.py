@@ -0,0 +1,109 @@
+""" Configuration parsed once from CONFIG_PATH, validated and frozen, with an atomic reload. """
+
+import os
+import tomllib
+from types import MappingProxyType
+from collections.abc import Mapping
+
+# Keys read with [] somewhere in the code base, by section, with their expected type
+REQUIRED = {
+    "Settings": {"ConsoleLogLevel": str, "FileLogLevel": str, "areas": list},
+    "Paths": {"DatabasePath": str, "QuizDBPath": str, "LogFilePath": str},
+    "Features": {
+        flag: bool for flag in (
+            "EAgleAPIIntegration", "NocoDBIntegration", "ODGCommand", "IDCommand", "MentionHandler", "Whitelist",
+            "QRcodeGenerator", "FSQuiz", "FSQuizLogging", "FSQuizScheduledSends"
+        )
+    },
+    "Whitelist": {"cron": str}
+}
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+class ConfigError(Exception):
+    """ Raised when the configuration file cannot be parsed or fails validation. """
+
+_current: Mapping | None = None
+
+def _freeze(value):
+    """ Return a read-only copy: tables become mapping proxies and arrays become tuples. """
+
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+def _is_cron(value) -> bool:
+    """ Whether a value looks like a five-field cron expression. """
+
+    return isinstance(value, str) and len(value.split()) == 5
+
+def _validate(config: dict) -> None:
+    """ Check the sections and keys the bot relies on; raises ConfigError describing every problem found. """
+
+    errors = []
+    for section, keys in REQUIRED.items():
+        if not isinstance(config.get(section), dict):
+            errors.append(f"missing section [{section}]")
+            continue
+        for key, expected in keys.items():
+            if key not in config[section]:
+                errors.append(f"missing [{section}] {key}")
+            elif not isinstance(config[section][key], expected):
+                errors.append(f"[{section}] {key} must be a {expected.__name__}")
+
+    for key in ("ConsoleLogLevel", "FileLogLevel"):
+        if key in config.get("Settings", {}) and config["Settings"][key] not in LOG_LEVELS:
+            errors.append(f"[Settings] {key} must be one of {', '.join(LOG_LEVELS)}")
+
+    if "cron" in config.get("Whitelist", {}) and not _is_cron(config["Whitelist"]["cron"]):
+        errors.append("[Whitelist] cron must have five fields")
+
+    if config.get("Features", {}).get("QRcodeGenerator") and not isinstance(config.get("Whitelist", {}).get("QRcodeGroups"), list):
+        errors.append("[Whitelist] QRcodeGroups must be a list when the QR code generator is enabled")
+
+    if config.get("Features", {}).get("FSQuizImageMirror") and not isinstance(config.get("Paths", {}).get("ImageMirrorPath"), str):
+        errors.append("[Paths] ImageMirrorPath is required when the quiz image mirror is enabled")
+
+    if config.get("Features", {}).get("FSQuizScheduledSends"):
+        for division, division_config in config.get("ScheduledQuestions", {}).items():
+            threads = division_config.get("Threads", [])
+            if len(division_config.get("Scheduling", [])) != len(threads) or len(division_config.get("area", [])) != len(threads):
+                errors.append(f"[ScheduledQuestions.{division}] needs one Scheduling and one area entry per thread")
+            if not all(_is_cron(cron) for cron in division_config.get("Scheduling", [])):
+                errors.append(f"[ScheduledQuestions.{division}] Scheduling entries must have five fields")
+
+    if config.get("Webhook", {}).get("Enabled") and not config["Webhook"].get("URL"):
+        errors.append("[Webhook] URL is required when the webhook is enabled")
+
+    if errors:
+        raise ConfigError("; ".join(errors))
+
+def load_config(path: str = None) -> Mapping:
+    """ Parse, validate and freeze the configuration file (CONFIG_PATH by default) and make it the current one. """
+
+    global _current
+
+    try:
+        with open(path or os.getenv("CONFIG_PATH"), "rb") as f:
+            config = tomllib.load(f)
+    except (OSError, TypeError, tomllib.TOMLDecodeError) as e:
+        raise ConfigError(f"cannot read config: {e}") from e
+
+    _validate(config)
+
+    # A single assignment swaps the whole config, so readers see either the old one or the new one
+    _current = _freeze(config)
+    return _current
+
+def get_config() -> Mapping:
+    """ Return the current configuration, loading it on first use. """
+
+    return _current if _current is not None else load_config()
+
+def reload_config() -> tuple[Mapping, Mapping]:
+    """ Load the file again and swap it in; returns (old, new). On ConfigError the current config is kept. """
+
+    old = get_config()
+    return old, load_config()
@@ -1,16 +1,10 @@
 from datetime import datetime  # used for timestamps on Task creation
 from pony.orm import Database, Required, Optional, Set  # Pony ORM constructs
-import tomllib
-import logging
-import os
-
-# Load configuration from config.ini
-with open(os.getenv("CONFIG_PATH"), "rb") as f:
-    try:
-        config = tomllib.load(f)
-    except tomllib.TOMLDecodeError as e:
-        logging.error(f"modules/database - Error parsing data/config.ini: {e}")
-        exit(1)
+from modules.storage import offloaded  # runs blocking queries on the storage thread pool
+from modules.config import get_config
+
+# Shared configuration, parsed once by modules/config; the sections read here only change on restart
+config = get_config()
 
 # Create a Database object connected to a SQLite file.
 db = Database()
@@ -62,3 +56,37 @@ class ODG(db.Entity):
 
 # Generate mapping between the above entities and the actual database tables.
 db.generate_mapping(create_tables=True)
+
+# Async access helpers: each runs on the storage pool inside its own db_session and returns plain values,
+# so handlers never hold a transaction open across Telegram calls.
+
+def _get_or_create_odg(chat_id: int, thread_id: int | None) -> ODG:
+    """ Fetch the ODG for a chat/thread or create a new one; must be called inside a db_session. """
+
+    if not (odg := ODG.get(chatId=chat_id, threadId=thread_id)):
+        odg = ODG(chatId=chat_id, threadId=thread_id)
+    return odg
+
+@offloaded
+def odg_text(chat_id: int, thread_id: int | None) -> str:
+    """ Return the rendered task list of a chat/thread. """
+
+    return str(_get_or_create_odg(chat_id, thread_id))
+
+@offloaded
+def odg_add(chat_id: int, thread_id: int | None, text: str, created_by: str) -> None:
+    """ Add a task to the ODG of a chat/thread. """
+
+    Task(text=text, created_by=created_by, odg=_get_or_create_odg(chat_id, thread_id))
+
+@offloaded
+def odg_reset(chat_id: int, thread_id: int | None) -> None:
+    """ Remove every task from the ODG of a chat/thread. """
+
+    _get_or_create_odg(chat_id, thread_id).reset()
+
+@offloaded
+def odg_remove(chat_id: int, thread_id: int | None, task_idx: int) -> bool:
+    """ Remove a task by zero-based index from the ODG of a chat/thread. """
+
+    return _get_or_create_odg(chat_id, thread_id).remove_task(task_idx)
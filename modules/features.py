@@ -0,0 +1,134 @@
+""" Feature registry: every feature imports its modules, and binds its databases, only when its [Features] flag is on. """
+
+import os
+import logging
+from telegram.ext import Application, CommandHandler, MessageHandler, PollAnswerHandler, filters
+
+def _nocodb(application: Application, config: dict) -> None:
+    """ Create the NocoDB client and the member directory on top of it. """
+
+    from modules.nocodb import NocoDB, MemberDirectory
+
+    nocodb = NocoDB(
+        config['Settings']['NOCO_URL'],
+        os.getenv("NOCO_API_KEY"),
+        page_size=config['Settings'].get('NocoPageSize', 200),
+        max_concurrency=config['Settings'].get('NocoMaxConcurrency', 8),
+        max_retries=config['Settings'].get('NocoMaxRetries', 3),
+        breaker_threshold=config['Settings'].get('NocoBreakerThreshold', 5),
+        breaker_reset=config['Settings'].get('NocoBreakerResetSeconds', 30)
+    )
+    application.bot_data["nocodb"] = nocodb
+    application.bot_data["directory"] = MemberDirectory(nocodb, ttl=config['Settings'].get('MemberDirectoryTTL', 600))
+
+def _mentions(application: Application, config: dict) -> None:
+    """ Register the mention handler and /tags. """
+
+    from commands.tags import tags
+    from commands.mentions import mention_handler
+
+    application.add_handler(CommandHandler("tags", tags))
+    application.add_handler(MessageHandler((filters.TEXT | filters.CAPTION) & ~filters.COMMAND, mention_handler))
+
+def _id(application: Application, config: dict) -> None:
+    """ Register /id. """
+
+    from commands.id import id
+
+    application.add_handler(CommandHandler("id", id))
+
+def _odg(application: Application, config: dict) -> None:
+    """ Register /odg; importing it binds the main database. """
+
+    from commands.odg import odg
+
+    application.add_handler(CommandHandler("odg", odg))
+
+def _eagle(application: Application, config: dict) -> None:
+    """ Create the EagleAPI client and lab presence cache, then register /inlab and /ore. """
+
+    from modules.api_client import EagleAPI
+    from modules.presence import LabPresence
+    from commands.inlab import inlab
+    from commands.ore import ore
+
+    eagle_api = EagleAPI(config['Settings']['EAGLE_API_URL'])
+    application.bot_data["eagle_api"] = eagle_api
+    application.bot_data["presence"] = LabPresence(eagle_api, application.bot_data.get("directory"), ttl=config['Settings'].get('PresenceCacheTTL', 5))
+    application.add_handler(CommandHandler("inlab", inlab))
+    application.add_handler(CommandHandler("ore", ore))
+
+def _qr(application: Application, config: dict) -> None:
+    """ Create the Shlink client and register /qr; importing it loads qrcode and Pillow. """
+
+    from modules.shlink import ShlinkAPI
+    from commands.qr import qr
+
+    application.bot_data["shlink_api"] = ShlinkAPI(config['Settings']['SHLINK_API_URL'], os.getenv("SHLINK_API_KEY"))
+    application.add_handler(CommandHandler("qr", qr))
+
+def _quiz(application: Application, config: dict) -> None:
+    """ Register the quiz commands; importing them binds and maps the quiz database. """
+
+    from commands.question import question
+    from commands.quiz import quiz
+    from commands.quizzes import quizzes
+    from commands.event import event
+    from commands.events import events
+    from commands.answer import answer
+    from commands.validate import validate
+
+    application.add_handler(CommandHandler("question", question))
+    application.add_handler(CommandHandler("quiz", quiz))
+    application.add_handler(CommandHandler("quizzes", quizzes))
+    application.add_handler(CommandHandler("event", event))
+    application.add_handler(CommandHandler("events", events))
+    application.add_handler(CommandHandler("answer", answer))
+    application.add_handler(CommandHandler("validate", validate))
+    application.bot_data["areas"] = config['Settings']['areas']
+
+def _quiz_logging(application: Application, config: dict) -> None:
+    """ Register the poll answer handler that logs quiz answers to NocoDB. """
+
+    from commands.question_answer import question_answer
+
+    application.add_handler(PollAnswerHandler(question_answer))
+
+def _traces(application: Application, config: dict) -> None:
+    """ Register /traces. """
+
+    from commands.traces import traces
+
+    application.add_handler(CommandHandler("traces", traces))
+
+def _debug(application: Application, config: dict) -> None:
+    """ Register /debug and create the event-loop lag monitor it reports; the monitor starts in the post-init hook. """
+
+    from modules.profiler import LoopMonitor
+    from commands.debug import debug
+
+    application.bot_data["loop_monitor"] = LoopMonitor()
+    application.add_handler(CommandHandler("debug", debug))
+
+# (log name, predicate over [Features], register function), in registration order: later features may use
+# what earlier ones put in bot_data (e.g. the Eagle presence cache uses the NocoDB member directory)
+FEATURES = (
+    ("NocoDB integration", lambda f: f['NocoDBIntegration'], _nocodb),
+    ("Mention handler and /tags command", lambda f: f['MentionHandler'] and f['NocoDBIntegration'] and f['Whitelist'], _mentions),
+    ("Info command", lambda f: f['IDCommand'], _id),
+    ("ODG command", lambda f: f['ODGCommand'], _odg),
+    ("Eagle API integration", lambda f: f['EAgleAPIIntegration'], _eagle),
+    ("QR code generator", lambda f: f['QRcodeGenerator'], _qr),
+    ("Quiz feature", lambda f: f['FSQuiz'], _quiz),
+    ("Quiz logging", lambda f: f['FSQuizLogging'] and f['FSQuiz'] and f['NocoDBIntegration'], _quiz_logging),
+    ("Traces command", lambda f: f.get('TracesCommand', False), _traces),
+    ("Debug command", lambda f: f.get('DebugCommand', False), _debug)
+)
+
+def register_features(application: Application, config: dict) -> None:
+    """ Import and register every enabled feature; disabled features are never imported. """
+
+    for name, enabled, register in FEATURES:
+        if enabled(config['Features']):
+            register(application, config)
+            logging.info(f"modules/features - {name} enabled.")
@@ -0,0 +1,72 @@
+import time
+import httpx
+from telegram.request import HTTPXRequest
+from modules.metrics import OUTBOUND_LATENCY, OUTBOUND_REQUESTS, outcome
+from modules import tracing
+
+# Explicit connect/read timeouts so a slow backend fails fast instead of stalling the handler awaiting it
+TIMEOUT = httpx.Timeout(connect=5.0, read=15.0, write=15.0, pool=5.0)
+
+# Connection pool limits applied to every outbound API client
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0)
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """ Transport that records the latency and outcome of every request sent to a backend. """
+
+    def __init__(self, backend: str, transport: httpx.AsyncBaseTransport):
+        """ Wrap a transport; backend is the label every request is recorded under. """
+
+        self.backend = backend
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """ Send the request and record it, including when it fails. """
+
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            OUTBOUND_REQUESTS.inc(self.backend, "error")
+            raise
+        finally:
+            OUTBOUND_LATENCY.observe(time.perf_counter() - start, self.backend, request.method)
+        OUTBOUND_REQUESTS.inc(self.backend, outcome(response.status_code))
+        return response
+
+    async def aclose(self) -> None:
+        """ Close the wrapped transport. """
+
+        await self._transport.aclose()
+
+def new_client(backend: str, headers: dict = None, timeout: httpx.Timeout = TIMEOUT) -> httpx.AsyncClient:
+    """ Create a pooled AsyncClient with the shared timeouts and connection limits, instrumented and traced under the backend label. """
+
+    transport = InstrumentedTransport(backend, httpx.AsyncHTTPTransport(limits=LIMITS))
+    return httpx.AsyncClient(headers=headers, timeout=timeout, transport=transport, event_hooks=tracing.hooks(backend))
+
+class TelegramRequest(HTTPXRequest):
+    """ PTB request backend that records the latency and outcome of every Bot API call by method. """
+
+    async def do_request(self, url: str, method: str, request_data=None, read_timeout=HTTPXRequest.DEFAULT_NONE,
+                         write_timeout=HTTPXRequest.DEFAULT_NONE, connect_timeout=HTTPXRequest.DEFAULT_NONE,
+                         pool_timeout=HTTPXRequest.DEFAULT_NONE) -> tuple[int, bytes]:
+        """ Send the Bot API request and record it under its API method name. """
+
+        api_method = url.rsplit("/", 1)[-1]
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            status, payload = await super().do_request(
+                url, method, request_data=request_data, read_timeout=read_timeout,
+                write_timeout=write_timeout, connect_timeout=connect_timeout, pool_timeout=pool_timeout
+            )
+        except Exception:
+            OUTBOUND_REQUESTS.inc("telegram", "error")
+            raise
+        finally:
+            OUTBOUND_LATENCY.observe(time.perf_counter() - start, "telegram", api_method)
+        OUTBOUND_REQUESTS.inc("telegram", outcome(status))
+
+        # Trace by API method only: the URL path contains the bot token
+        tracing.record("telegram", method, "/" + api_method, status, len(payload), (time.perf_counter() - start) * 1000, started_at)
+        return status, payload
@@ -0,0 +1,124 @@
+import os
+import asyncio
+import hashlib
+import logging
+import httpx
+from concurrent.futures import ProcessPoolExecutor
+from modules.media import IMAGE_BASE_URL
+from modules.metrics import timed_job
+from modules.quiz import image_paths, get_mirrored, save_mirrored, forget_file_ids
+
+# Telegram recompresses photos to at most 1280px on the longest side, so larger variants only cost upload time
+VARIANT_MAX_SIZE = 1280
+VARIANT_QUALITY = 85
+
+def _process_image(data: bytes, original_file: str, variant_file: str) -> None:
+    """ Store the original bytes and write a Telegram-optimized JPEG variant. Runs in a worker process. """
+
+    from PIL import Image
+    import io
+
+    os.makedirs(os.path.dirname(original_file), exist_ok=True)
+    os.makedirs(os.path.dirname(variant_file), exist_ok=True)
+
+    with open(original_file, "wb") as f:
+        f.write(data)
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((VARIANT_MAX_SIZE, VARIANT_MAX_SIZE))
+
+        # JPEG has no alpha channel: flatten transparent images onto white
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        # Write to a temporary file first so an interrupted run never leaves a truncated variant behind
+        tmp_file = variant_file + ".tmp"
+        img.save(tmp_file, "JPEG", quality=VARIANT_QUALITY, optimize=True)
+        os.replace(tmp_file, variant_file)
+
+class ImageMirror:
+    """ Mirrors fs-quiz images to the data volume and keeps Telegram-ready variants of them. """
+
+    def __init__(self, mirror_dir: str, workers: int = 2, downloads: int = 4):
+        """ Initialize the mirror rooted at mirror_dir. """
+
+        self.mirror_dir = os.path.abspath(mirror_dir)
+        self.workers = workers
+        self._downloads = asyncio.Semaphore(downloads)  # Caps concurrent requests to the image host
+
+    def _local_files(self, path: str) -> tuple[str, str] | None:
+        """ Return the (original, variant) files for an image path, or None if the path would escape the mirror directory. """
+
+        relative = os.path.normpath(path.lstrip("/"))
+        if relative.startswith(".."):
+            return None
+        return (
+            os.path.join(self.mirror_dir, "original", relative),
+            os.path.join(self.mirror_dir, "telegram", relative + ".jpg")
+        )
+
+    @timed_job("image_mirror")
+    async def run(self, refresh: bool = False) -> None:
+        """
+        Mirror every referenced image. The run is incremental and resumable: images already mirrored are skipped,
+        and each finished image is recorded immediately. With refresh=True every image is downloaded again, but
+        only images whose content hash changed are reprocessed.
+        """
+
+        paths = await image_paths()
+        mirrored = await get_mirrored()
+
+        pending = [
+            path for path in paths
+            if refresh or path not in mirrored or not os.path.exists(mirrored[path][1])
+        ]
+        if not pending:
+            logging.info(f"modules/image_mirror - All {len(paths)} images already mirrored.")
+            return
+
+        logging.info(f"modules/image_mirror - Mirroring {len(pending)} of {len(paths)} images to {self.mirror_dir}.")
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0), follow_redirects=True) as client:
+                results = await asyncio.gather(
+                    *[self._mirror_one(client, pool, loop, path, mirrored.get(path)) for path in pending],
+                    return_exceptions=True
+                )
+
+        failed = 0
+        for path, result in zip(pending, results):
+            if isinstance(result, Exception):
+                failed += 1
+                logging.warning(f"modules/image_mirror - Failed to mirror image {path}: {result}")
+
+        logging.info(f"modules/image_mirror - Mirror run finished: {len(pending) - failed} images processed, {failed} failed.")
+
+    async def _mirror_one(self, client: httpx.AsyncClient, pool, loop, path: str, previous: tuple[str, str] | None) -> None:
+        """ Download one image and, if its content changed, regenerate its variant. """
+
+        files = self._local_files(path)
+        if files is None:
+            raise ValueError("image path escapes the mirror directory")
+        original_file, variant_file = files
+
+        async with self._downloads:
+            res = await client.get(f"{IMAGE_BASE_URL}/{path}")
+            res.raise_for_status()
+            data = res.content
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        if previous and previous[0] == sha256 and os.path.exists(previous[1]):
+            return
+
+        await loop.run_in_executor(pool, _process_image, data, original_file, variant_file)
+        await save_mirrored(path, sha256, variant_file)
+
+        # The image changed upstream: the file_id cached for the old content must not be reused
+        if previous:
+            await forget_file_ids([path])
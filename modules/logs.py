@@ -0,0 +1,199 @@
+""" Queue-based logging: records are handed to a background thread that formats and writes them. """
+
+import os
+import gzip
+import json
+import time
+import queue
+import copy
+import atexit
+import shutil
+import logging
+import logging.handlers
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from telegram import Update
+from telegram.ext import ContextTypes
+
+# Color codes used for coloring log output in console only
+COLORS = {
+    "INFO": "\033[94m",
+    "WARNING": "\033[33m",
+    "ERROR": "\033[91m",
+    "RESET": "\033[0m"
+}
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# Structured fields attached to every record emitted while an update is being handled
+CONTEXT_FIELDS = ("handler", "user", "chat", "latency_ms")
+
+# Handler, user, chat, start time and update id of the update handled by the current task
+_update_context: ContextVar[tuple | None] = ContextVar("update_context", default=None)
+
+class ColorFormatter(logging.Formatter):
+    """Custom logging formatter to add colors based on log level."""
+
+    # The colored level tag of every level, built once instead of spliced into each message
+    LEVEL_TAGS = {level: f"{color}[{level}]{COLORS['RESET']}" for level, color in COLORS.items() if level != "RESET"}
+
+    def __init__(self):
+        """Initialize the formatter with the console layout."""
+
+        super().__init__("%(asctime)s %(level_tag)s %(message)s")
+
+    def formatMessage(self, record):
+        """Format log messages with colors based on severity level."""
+
+        record.level_tag = self.LEVEL_TAGS.get(record.levelname) or f"[{record.levelname}]"
+        return super().formatMessage(record)
+
+class JsonFormatter(logging.Formatter):
+    """ Formats records as JSON lines with the structured update fields. """
+
+    def format(self, record):
+        """ Return the record as a single JSON object. """
+
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """ Queue handler that keeps the traceback apart from the message, so the JSON formatter can put it in its own field. """
+
+    def prepare(self, record):
+        """ Merge the arguments into the message and render the traceback to text; live traceback objects never cross the queue. """
+
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class ContextFilter(logging.Filter):
+    """ Copies the current update context onto each record; runs in the emitting task, where the context is visible. """
+
+    def filter(self, record):
+        """ Attach handler, user, chat and the latency since the update started. """
+
+        current = _update_context.get()
+        if current:
+            record.handler, record.user, record.chat, started, _ = current
+            record.latency_ms = round((time.monotonic() - started) * 1000, 1)
+        return True
+
+class CompressedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """ Rotates when the file grows past max_bytes or gets older than interval seconds; rotated files are gzip-compressed. """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: int):
+        """ Initialize the handler; the age of an existing file counts towards the first time-based rotation. """
+
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        self.rollover_at = (os.path.getmtime(filename) if os.path.exists(filename) else time.time()) + interval
+        self.namer = lambda name: name + ".gz"
+        self.rotator = self._compress
+
+    @staticmethod
+    def _compress(source: str, dest: str) -> None:
+        """ Gzip the rotated file; runs on the logging thread. """
+
+        # Nothing to compress if the file was never created
+        if not os.path.exists(source):
+            return
+        with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def shouldRollover(self, record):
+        """ Rotate on age as well as on size. """
+
+        if self.interval and time.time() >= self.rollover_at:
+            # With delay=True the file may not exist yet: an empty or missing file just restarts the interval
+            if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+                return True
+            self.rollover_at = time.time() + self.interval
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        """ Rotate and schedule the next time-based rotation. """
+
+        # Reschedule even if the rotation fails, so one failure doesn't retry it on every record
+        try:
+            super().doRollover()
+        finally:
+            self.rollover_at = time.time() + self.interval
+
+async def bind_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """ Runs before every other handler: remembers what the update is so the log records it produces carry it. """
+
+    if update.poll_answer:
+        handler = "poll_answer"
+    elif update.message and update.message.text and update.message.text.startswith("/"):
+        handler = update.message.text.split(maxsplit=1)[0].split("@", 1)[0].lower()
+    elif update.message:
+        handler = "message"
+    else:
+        handler = "other"
+
+    user = update.effective_user.username if update.effective_user else None
+    chat = update.effective_chat.id if update.effective_chat else None
+    _update_context.set((handler, user, chat, time.monotonic(), update.update_id))
+
+def current_update() -> tuple[int, str] | None:
+    """ Return the (update id, handler) of the update handled by the current task, if any. """
+
+    current = _update_context.get()
+    return (current[4], current[0]) if current else None
+
+def setup_logging(config) -> logging.handlers.QueueListener:
+    """
+    Route every record through a queue to a background thread that writes the console and the rotating log file,
+    so a slow disk never blocks the event loop. Returns the started listener; it is flushed and stopped at exit.
+    """
+
+    console_level = getattr(logging, config["Settings"]["ConsoleLogLevel"])
+    file_level = getattr(logging, config["Settings"]["FileLogLevel"])
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(ColorFormatter())
+
+    file_handler = CompressedRotatingFileHandler(
+        config["Paths"]["LogFilePath"],
+        max_bytes=config["Settings"].get("LogMaxBytes", 10 * 1024 * 1024),
+        backup_count=config["Settings"].get("LogBackupCount", 7),
+        interval=config["Settings"].get("LogRotateHours", 24) * 3600
+    )
+    file_handler.setLevel(file_level)
+    file_handler.setFormatter(JsonFormatter() if config["Settings"].get("LogFormat", "text") == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    # Replace the startup console handler; the root level lets through whatever either handler wants
+    root_logger = logging.getLogger()
+    root_logger.handlers = [queue_handler]
+    root_logger.setLevel(min(console_level, file_level))
+
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -0,0 +1,68 @@
+import os
+import logging
+from pathlib import Path
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+from modules.metrics import CACHE_REQUESTS
+from modules.quiz import get_file_ids, save_file_ids, forget_file_ids, get_mirrored
+
+# Base URL of the fs-quiz image host; Images.path is relative to it
+IMAGE_BASE_URL = "https://img.fs-quiz.eu"
+
+async def _upload_sources(paths) -> dict:
+    """ Return the source to upload each image from: the local mirrored variant if present, else the image host URL. """
+
+    if not paths:
+        return {}
+
+    mirrored = await get_mirrored(paths)
+    sources = {}
+    for path in paths:
+        local_file = mirrored.get(path, (None, None))[1]
+        sources[path] = Path(local_file) if local_file and os.path.exists(local_file) else f"{IMAGE_BASE_URL}/{path}"
+    return sources
+
+async def _send(paths, sources: dict, send_photo, send_media_group, caption):
+    """ Send the images using the given sources (file_id, local file or URL) and return the resulting messages. """
+
+    if len(paths) == 1:
+        return [await send_photo(photo=sources[paths[0]], caption=caption)]
+
+    return list(await send_media_group(media=[InputMediaPhoto(media=sources[path]) for path in paths]))
+
+async def send_images(paths, send_photo, send_media_group, caption: str = None) -> None:
+    """
+    Send quiz images, reusing the Telegram file_id cached from a previous send.
+    Images without a cached file_id are uploaded from the local mirror when available, else from their URL.
+    A single image is sent as a photo with the caption; several are sent as a media group without it.
+    If Telegram rejects a cached file_id, the cache entries are dropped and the images are uploaded again.
+    """
+
+    paths = list(paths)
+    cached = await get_file_ids(paths)
+    CACHE_REQUESTS.inc("file_id", "hit", amount=len(cached))
+    CACHE_REQUESTS.inc("file_id", "miss", amount=len(paths) - len(cached))
+    uploads = await _upload_sources([path for path in paths if path not in cached])
+    sources = {path: cached.get(path) or uploads[path] for path in paths}
+
+    try:
+        messages = await _send(paths, sources, send_photo, send_media_group, caption)
+    except BadRequest as e:
+        if not cached:
+            raise
+
+        # The file_id expired or became invalid: forget it and upload the images again
+        logging.warning(f"modules/media - Cached file_id rejected for {list(cached)}, uploading again: {e}")
+        await forget_file_ids(list(cached))
+        cached = {}
+        sources = await _upload_sources(paths)
+        messages = await _send(paths, sources, send_photo, send_media_group, caption)
+
+    # Remember the file_id Telegram assigned to every image that was uploaded
+    new_file_ids = {
+        path: message.photo[-1].file_id
+        for path, message in zip(paths, messages)
+        if path not in cached and message.photo
+    }
+    if new_file_ids:
+        await save_file_ids(new_file_ids)
@@ -0,0 +1,228 @@
+""" In-process metrics exported in the Prometheus text format by a small local HTTP listener. """
+
+import time
+import asyncio
+import logging
+import functools
+from contextlib import contextmanager
+from telegram.ext import ApplicationHandlerStop
+
+# Default latency buckets in seconds, from a cached reply to a slow NocoDB page
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = []  # Every metric, in registration order, rendered by render()
+
+def _escape(value) -> str:
+    """ Escape a label value for the text format. """
+
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """ Render a label set, optionally followed by an extra pre-rendered label. """
+
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """ Monotonic counter with labels. """
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        """ Create and register the counter. """
+
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        _metrics.append(self)
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        """ Increase the counter of a label set. """
+
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        """ Return the text format lines of the counter. """
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in self._values.items()]
+        return lines
+
+class Histogram:
+    """ Cumulative histogram with labels. """
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = BUCKETS):
+        """ Create and register the histogram. """
+
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._values: dict[tuple, list] = {}  # Labels -> [per-bucket counts..., +Inf count, sum]
+        _metrics.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        """ Record one observation for a label set. """
+
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[len(self.buckets)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """ Observe the duration of the with block, including when it raises. """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        """ Return the text format lines of the histogram. """
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            cumulative += counts[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class Gauge:
+    """ Gauge whose values are read from a callback at scrape time. """
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        """ Create and register the gauge. """
+
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._callbacks = []
+        _metrics.append(self)
+
+    def track(self, callback) -> None:
+        """ Add a callback returning a {labels tuple: value} dict. """
+
+        self._callbacks.append(callback)
+
+    def render(self) -> list[str]:
+        """ Return the text format lines of the gauge. """
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for callback in self._callbacks:
+            lines += [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in callback().items()]
+        return lines
+
+HANDLER_LATENCY = Histogram("bot_handler_duration_seconds", "Time spent in each update handler.", ("handler",))
+HANDLER_ERRORS = Counter("bot_handler_errors_total", "Update handlers that raised.", ("handler",))
+OUTBOUND_LATENCY = Histogram("bot_outbound_request_duration_seconds", "Latency of outbound HTTP calls.", ("backend", "operation"))
+OUTBOUND_REQUESTS = Counter("bot_outbound_requests_total", "Outbound HTTP calls by outcome (status class or error).", ("backend", "outcome"))
+CACHE_REQUESTS = Counter("bot_cache_requests_total", "Cache lookups by result; the hit ratio is hit / (hit + miss).", ("cache", "result"))
+JOB_DURATION = Histogram("bot_job_duration_seconds", "Duration of scheduled and background jobs.", ("job",))
+BREAKER_OPEN = Gauge("bot_circuit_breaker_open", "Whether a backend's circuit breaker is open (1) or half-open/closed (0).", ("backend",))
+
+def outcome(status_code: int) -> str:
+    """ Return the outcome label of an HTTP status code. """
+
+    return f"{status_code // 100}xx"
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    """ Count a cache hit or miss. """
+
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+def timed_job(job: str):
+    """ Decorator observing the duration of an async job. """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with JOB_DURATION.time(job):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _handler_name(handler) -> str:
+    """ Return the label of a registered handler: its command, else its callback name. """
+
+    commands = getattr(handler, "commands", None)
+    return "/" + sorted(commands)[0] if commands else handler.callback.__qualname__
+
+def instrument_handlers(application) -> None:
+    """ Wrap the callback of every registered handler to observe its latency and errors. """
+
+    for group in application.handlers.values():
+        for handler in group:
+            name = _handler_name(handler)
+            callback = handler.callback
+
+            @functools.wraps(callback)
+            async def wrapper(update, context, callback=callback, name=name):
+                start = time.perf_counter()
+                try:
+                    return await callback(update, context)
+                except ApplicationHandlerStop:
+                    # Raised on purpose (e.g. by the auth gate) to stop the update, not a failure
+                    raise
+                except Exception:
+                    HANDLER_ERRORS.inc(name)
+                    raise
+                finally:
+                    HANDLER_LATENCY.observe(time.perf_counter() - start, name)
+
+            handler.callback = wrapper
+
+def render() -> str:
+    """ Return every metric in the Prometheus text format. """
+
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """ Answer one HTTP request: GET /metrics returns the metrics, anything else a 404. """
+
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers; the request has no body
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"Not Found\n"
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host: str, port: int) -> asyncio.Server:
+    """ Start the metrics listener. """
+
+    server = await asyncio.start_server(_handle, host, port)
+    logging.info(f"modules/metrics - Metrics available at http://{host}:{port}/metrics")
+    return server
@@ -1,95 +1,126 @@
 import httpx
-import tomllib
+import asyncio
+import time
+from modules.config import get_config
 import logging
-import os
+from modules.http import new_client
+from modules.transport import CircuitBreaker, CircuitOpenError, ResilientTransport
+from modules.metrics import BREAKER_OPEN, cache_lookup
 
-# Load configuration from config.ini
-with open(os.getenv("CONFIG_PATH"), "rb") as f:
-    try:
-        config = tomllib.load(f)
-    except tomllib.TOMLDecodeError as e:
-        logging.error(f"modules/nocodb - Error parsing data/config.ini: {e}")
-        exit(1)
+# Shared configuration, parsed once by modules/config; the sections read here only change on restart
+config = get_config()
+
+# Tag cache keys mapped to their NocoDB config section
+TAG_KINDS = {
+    "areas": "area",
+    "workgroups": "workgroup",
+    "projects": "project",
+    "roles": "role"
+}
+
+class PartialWriteError(Exception):
+    """ Raised when a bulk write stored only part of its records; written holds the keys that were stored. """
+
+    def __init__(self, message: str, written: frozenset[str]):
+        """ Initialize the error with the keys that were written before the failure. """
+
+        super().__init__(message)
+        self.written = written
 
 class NocoDB:
     """ Minimal client for querying specific tables in a NocoDB instance. """
 
-    def __init__(self, base_url: str, api_key: str):
-        """ Initialize the NocoDB client with base URL and API key. """
+    def __init__(self, base_url: str, api_key: str, page_size: int = 200, max_concurrency: int = 8, max_retries: int = 3, breaker_threshold: int = 5, breaker_reset: float = 30.0):
+        """ Initialize the NocoDB client with base URL, API key, default page size and transport limits. """
 
         # store base url without trailing slash to make URL composition predictable
         self.base_url = base_url.rstrip("/")
 
-        # reuse a session for connection pooling and consistent headers
-        self._session = httpx.AsyncClient(timeout=60.0)
-        self._session.headers.update({
+        # number of records requested per page when iterating over a table
+        self.page_size = page_size
+
+        # reuse a pooled session for connection pooling and consistent headers;
+        # reads get a longer timeout since large pages can take a while to build
+        self._session = new_client("nocodb", headers={
             # NocoDB expects the API key in the 'xc-token' header
             'xc-token': api_key,
             'Content-Type': 'application/json'
-        })
+        }, timeout=httpx.Timeout(60.0, connect=5.0))
 
-    async def tags(self, kind: str) -> list[str]:
-        """ Return all tags for the given kind. """
+        # every request goes through the transport: it caps concurrency, retries 429/5xx with backoff
+        # and fails fast while the breaker is open so callers fall back to their cached data
+        self.breaker = CircuitBreaker("NocoDB", failure_threshold=breaker_threshold, reset_timeout=breaker_reset)
+        self._transport = ResilientTransport(self._session, self.breaker, max_concurrency=max_concurrency, max_retries=max_retries)
+        BREAKER_OPEN.track(lambda: {("nocodb",): int(self.breaker.state == CircuitBreaker.OPEN)})
 
-        # fetch all records from the relevant table, requesting only the Tag field
-        res = await self._session.get(
-            f"{self.base_url}/api/v2/tables/{config['NocoDB'][kind]['table']}/records",
-            params={"limit": 1000, "fields": "Tag"}
-        )
-        res.raise_for_status()
-        items = res.json().get("list")
-        if not items:
-            return []
-        return [f"@{item['Tag'].lower().strip()}" for item in items]
+    async def aclose(self) -> None:
+        """ Close the underlying connection pool. """
 
-    async def members(self, tag: str, kind: str) -> list[str]:
-        """ Return Telegram usernames for the given tag and kind. """
+        await self._session.aclose()
 
-        # find the NocoDB internal Id for the record that matches the tag
-        nocoid_res = await self._session.get(
-            f"{self.base_url}/api/v2/tables/{config['NocoDB'][kind]['table']}/records",
-            params={"limit": 1000, "where": f"(Tag,like,{tag})", "fields": "Id"}
-        )
-        nocoid_res.raise_for_status()
-        nocoid = nocoid_res.json().get("list")[0].get("Id")
+    async def _paginate(self, url: str, params: dict, page_size: int = None):
+        """ Yield every record of a NocoDB list endpoint, requesting one page at a time until pageInfo reports the last page. """
 
-        # fetch linked member records for that record via the link endpoint
-        res = await self._session.get(
-            f"{self.base_url}/api/v2/tables/{config['NocoDB'][kind]['table']}/links/{config['NocoDB'][kind]['link']}/records/{nocoid}",
-            params={"limit": 1000}
-        )
-        res.raise_for_status()
-        res = res.json().get("list")
-        if not res:
-            return []
-
-        member_ids = [str(item["Id"]) for item in res]
-
-        # fetch member records by Id and request only the Telegram Username field
-        params = {
-            "limit": 1000,
-            "where": f"(Id,in,{','.join(member_ids)})",
-            "fields": "Telegram Username",
-            "viewId": config['NocoDB']['members']["view"] # use view to filter out inactive members
-        }
+        params = {**params, "limit": page_size or self.page_size, "offset": 0}
 
-        res = await self._session.get(
-            f"{self.base_url}/api/v2/tables/{config['NocoDB']['members']['table']}/records",
-            params=params
-        )
+        while True:
+            res = await self._transport.get(url, params=params)
+            res.raise_for_status()
+            body = res.json()
 
-        res.raise_for_status()
+            items = body.get("list") or []
+            for item in items:
+                yield item
 
-        items = res.json().get("list")
-        return [f"{item['Telegram Username'].lower().strip()}" for item in items if item.get("Telegram Username")]
+            if not items or (body.get("pageInfo") or {}).get("isLastPage", True):
+                return
+            params["offset"] += len(items)
+
+    async def iter_records(self, table: str, fields: list[str] = None, where: str = None, view: str = None, page_size: int = None):
+        """ Yield the records of a table page by page, optionally projected to the given fields, filtered and restricted to a view. """
+
+        params = {}
+        if fields:
+            params["fields"] = ",".join(fields)
+        if where:
+            params["where"] = where
+        if view:
+            params["viewId"] = view
+
+        async for item in self._paginate(f"{self.base_url}/api/v2/tables/{table}/records", params, page_size):
+            yield item
+
+    async def iter_links(self, table: str, link: str, record_id: int, fields: list[str] = None, page_size: int = None):
+        """ Yield the records linked to a record through a link field, page by page. """
+
+        params = {"fields": ",".join(fields)} if fields else {}
+
+        async for item in self._paginate(f"{self.base_url}/api/v2/tables/{table}/links/{link}/records/{record_id}", params, page_size):
+            yield item
+
+    async def tags(self, kind: str) -> list[str]:
+        """ Return all tags for the given kind. """
+
+        # stream all records from the relevant table, requesting only the Tag field
+        return [
+            f"@{item['Tag'].lower().strip()}"
+            async for item in self.iter_records(config['NocoDB'][kind]['table'], fields=["Tag"])
+            if item.get("Tag")
+        ]
+
+    async def tag_cache(self) -> dict[str, list[str]]:
+        """ Return the tags of every kind, fetched concurrently, keyed like the bot's tag cache. """
+
+        results = await asyncio.gather(*[self.tags(kind) for kind in TAG_KINDS.values()])
+        return dict(zip(TAG_KINDS.keys(), results))
 
     async def email_from_username(self, username: str) -> str:
         """ Lookup the Team Email for a given Telegram username. """
 
-        res = await self._session.get(
+        res = await self._transport.get(
             f"{self.base_url}/api/v2/tables/{config['NocoDB']['members']['table']}/records",
             params={
-                "limit": 1000,
+                "limit": 1,
                 "where": f"(Telegram Username,like,@{username})~or(Telegram Username,like,{username})",
                 "fields": "Team Email"
             }
@@ -103,10 +134,10 @@ class NocoDB:
     async def username_from_email(self, email: str) -> str:
         """ Lookup the Telegram Username for a given Team Email. """
 
-        res = await self._session.get(
+        res = await self._transport.get(
             f"{self.base_url}/api/v2/tables/{config['NocoDB']['members']['table']}/records",
             params={
-                "limit": 1000,
+                "limit": 1,
                 "where": f"(Team Email,eq,{email})",
                 "fields": "Telegram Username"
             }
@@ -115,41 +146,354 @@ class NocoDB:
         items = res.json().get("list")
         return items[0].get("Telegram Username", "") if items else None
 
-    async def quiz_answer_log(self, username: str, is_correct: bool) -> None:
-        """ Log a question answer attempt for the given username. """
+    async def quiz_answer_log_bulk(self, deltas: dict[str, tuple[int, int]]) -> None:
+        """
+        Add aggregated (answered, correct) deltas to the quiz stats of many usernames at once.
+        Raises PartialWriteError if the existing users were updated but the new ones could not be created.
+        """
+
+        if not deltas:
+            return
 
         table = config['NocoDB']['quiz']['table']
         url = f"{self.base_url}/api/v2/tables/{table}/records"
 
-        # Find existing record for the username
+        # Find the existing records for every username in the batch with a single request
         find_params = {
-            "where": f"(username,eq,{username})",
-            "fields": "Id,answered,correct",
-            "limit": 1
+            "where": "~or".join(f"(username,eq,{username})" for username in deltas),
+            "fields": "Id,username,answered,correct",
+            "limit": len(deltas)
         }
-        res = await self._session.get(url, params=find_params)
+        res = await self._transport.get(url, params=find_params)
         res.raise_for_status()
-        records = res.json().get("list", [])
+        records = {record['username']: record for record in res.json().get("list", [])}
 
-        if records:
-            # User exists, update their stats
-            record = records[0]
-            record_id = record['Id']
+        updates = []
+        creates = []
+        for username, (answered, correct) in deltas.items():
+            if username in records:
+                # User exists, add the deltas to their stats
+                record = records[username]
+                updates.append({
+                    "Id": record['Id'],
+                    "answered": (record.get('answered') or 0) + answered,
+                    "correct": (record.get('correct') or 0) + correct
+                })
+            else:
+                # User does not exist, create a new record
+                creates.append({
+                    "username": username,
+                    "answered": answered,
+                    "correct": correct
+                })
 
-            payload = {
-                "Id": record_id,
-                "answered": record.get('answered', 0) + 1,
-                "correct": record.get('correct', 0) + (1 if is_correct else 0)
-            }
-
-            update_res = await self._session.patch(f"{url}", json=payload)
+        # NocoDB accepts a list of records for bulk update and bulk create
+        if updates:
+            update_res = await self._transport.patch(url, json=updates)
             update_res.raise_for_status()
+        if creates:
+            try:
+                create_res = await self._transport.post(url, json=creates)
+                create_res.raise_for_status()
+            except Exception as e:
+                # The updates are already stored: the caller must not write them again
+                if updates:
+                    raise PartialWriteError(f"updated {len(updates)} users but failed to create {len(creates)}: {e}", frozenset(username for username in deltas if username in records)) from e
+                raise
+
+class MemberDirectory:
+    """ Bidirectional Team Email <-> Telegram username cache over the NocoDB members table. """
+
+    # Seconds to wait before retrying a failed bulk load, while serving the previous maps
+    RETRY_DELAY = 60
+
+    def __init__(self, nocodb: NocoDB, ttl: int = 600):
+        """ Initialize an empty directory that loads on first use and reloads after ttl seconds. """
+
+        self.nocodb = nocodb
+        self.ttl = ttl
+
+        self._by_email: dict[str, str] = {}  # Lowercased Team Email -> Telegram Username (as stored in NocoDB)
+        self._by_username: dict[str, str] = {}  # Lowercased username without '@' -> Team Email
+        self._misses: set[str] = set()  # Emails and '@'-prefixed usernames looked up individually without a match since the last load
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        """ Normalize a Telegram username for lookups. """
+
+        return username.lower().strip().lstrip("@")
+
+    async def _ensure_fresh(self) -> None:
+        """ Reload the whole members table if the TTL expired; concurrent callers share one load. """
+
+        if time.monotonic() < self._expires_at:
+            return
+
+        async with self._lock:
+            if time.monotonic() < self._expires_at:
+                return
+
+            try:
+                by_email, by_username = {}, {}
+                async for item in self.nocodb.iter_records(config['NocoDB']['members']['table'], fields=["Telegram Username", "Team Email"]):
+                    username, email = item.get("Telegram Username"), item.get("Team Email")
+                    if username and email:
+                        by_email[email.lower().strip()] = username
+                        by_username[self._username_key(username)] = email
+            except Exception as e:
+                logging.error(f"modules/nocodb - Member directory reload failed, serving previous data: {e}")
+                self._expires_at = time.monotonic() + min(self.RETRY_DELAY, self.ttl)
+                return
+
+            self._by_email, self._by_username = by_email, by_username
+            self._misses = set()
+            self._expires_at = time.monotonic() + self.ttl
+            logging.info(f"modules/nocodb - Member directory loaded with {len(by_email)} members.")
+
+    async def username_from_email(self, email: str) -> str | None:
+        """ Return the Telegram Username for a Team Email, falling back to a single NocoDB lookup on a miss. """
+
+        await self._ensure_fresh()
+
+        key = email.lower().strip()
+        cache_lookup("directory", key in self._by_email or key in self._misses)
+        if key in self._by_email:
+            return self._by_email[key]
+        if key in self._misses:
+            return None
+
+        try:
+            username = await self.nocodb.username_from_email(email)
+        except CircuitOpenError:
+            return None  # NocoDB is down: answer from the cached maps only
+        if username:
+            self._by_email[key] = username
+            self._by_username[self._username_key(username)] = email
         else:
-            # User does not exist, create a new record
-            payload = {
-                "username": username,
-                "answered": 1,
-                "correct": 1 if is_correct else 0
-            }
-            create_res = await self._session.post(url, json=payload)
-            create_res.raise_for_status()
+            self._misses.add(key)
+        return username
+
+    async def email_from_username(self, username: str) -> str | None:
+        """ Return the Team Email for a Telegram username, falling back to a single NocoDB lookup on a miss. """
+
+        await self._ensure_fresh()
+
+        key = self._username_key(username)
+        cache_lookup("directory", key in self._by_username or "@" + key in self._misses)
+        if key in self._by_username:
+            return self._by_username[key]
+        if "@" + key in self._misses:
+            return None
+
+        try:
+            email = await self.nocodb.email_from_username(username)
+        except CircuitOpenError:
+            return None  # NocoDB is down: answer from the cached maps only
+        if email:
+            self._by_username[key] = email
+        else:
+            self._misses.add("@" + key)
+        return email
+
+class MembershipSync:
+    """
+    Keeps the tag -> members map in sync with NocoDB using UpdatedAt watermarks.
+    Each refresh fetches the records changed since the previous one, plus the bare Ids of every table to detect
+    deleted tags and members that were deleted or left the members view. Link changes that update neither record's
+    UpdatedAt are invisible to it, so a full resync still runs periodically.
+    """
+
+    def __init__(self, nocodb: NocoDB, full_resync_interval: int = 30 * 60):
+        """ Initialize an empty state; the first refresh is a full sync. """
+
+        self.nocodb = nocodb
+        self.full_resync_interval = full_resync_interval
+
+        self.usernames: dict[int, str] = {}  # Active member Id -> Telegram username
+        self.tags: dict[str, dict[int, str]] = {kind: {} for kind in TAG_KINDS.values()}  # Kind -> record Id -> tag
+        self.links: dict[tuple[str, int], list[int]] = {}  # (kind, record Id) -> linked member Ids
+        self.watermarks: dict[str, str] = {}  # Table ('members' or a kind) -> highest UpdatedAt seen
+        self.seen: dict[str, frozenset[tuple[int, str]]] = {}  # Table -> (Id, UpdatedAt) of the rows already applied at its watermark
+        self._last_full: float | None = None
+
+    async def _members(self, where: str = None) -> list[dict]:
+        """ Return the active member records, optionally filtered. """
+
+        return [
+            item async for item in self.nocodb.iter_records(
+                config['NocoDB']['members']['table'],
+                fields=["Id", "Telegram Username", "UpdatedAt"],
+                where=where,
+                view=config['NocoDB']['members']["view"]  # use view to filter out inactive members
+            )
+        ]
+
+    async def _tag_records(self, kind: str, where: str = None) -> list[dict]:
+        """ Return the records of a tag table, optionally filtered. """
+
+        return [item async for item in self.nocodb.iter_records(config['NocoDB'][kind]['table'], fields=["Id", "Tag", "UpdatedAt"], where=where)]
+
+    async def _linked_ids(self, kind: str, record_id: int) -> list[int]:
+        """ Return the Ids of the members linked to a tag record. """
+
+        return [
+            item["Id"]
+            async for item in self.nocodb.iter_links(config['NocoDB'][kind]['table'], config['NocoDB'][kind]['link'], record_id, fields=["Id"])
+        ]
+
+    async def _ids(self, table: str) -> set[int]:
+        """ Return the Ids of every record of a table ('members' or a tag kind); members are restricted to the active view. """
+
+        view = config['NocoDB']['members']["view"] if table == "members" else None
+        return {item["Id"] async for item in self.nocodb.iter_records(config['NocoDB'][table]['table'], fields=["Id"], view=view)}
+
+    def _since(self, table: str) -> str | None:
+        """ Return the where clause selecting records updated at or after the table's watermark. """
+
+        watermark = self.watermarks.get(table)
+        return f"(UpdatedAt,gte,exactDate,{watermark})" if watermark else None
+
+    def _newer(self, table: str, records: list[dict]) -> list[dict]:
+        """
+        Keep only the records not applied yet and advance the watermark. The server filter is inclusive, so rows
+        updated in the same second as the watermark come back again and are skipped by their (Id, UpdatedAt) pair.
+        """
+
+        watermark = self.watermarks.get(table)
+        seen = self.seen.get(table, frozenset())
+        newer = [
+            r for r in records
+            if r.get("UpdatedAt") and (watermark is None or r["UpdatedAt"] >= watermark) and (r["Id"], r["UpdatedAt"]) not in seen
+        ]
+        if newer:
+            latest = max(r["UpdatedAt"] for r in newer)
+            at_latest = {(r["Id"], r["UpdatedAt"]) for r in records if r.get("UpdatedAt") == latest}
+            self.watermarks[table] = latest
+            self.seen[table] = frozenset(at_latest | seen if latest == watermark else at_latest)
+        return newer
+
+    @staticmethod
+    def _tag_name(record: dict) -> str | None:
+        """ Normalize a tag record to the '@tag' form used by the tag cache. """
+
+        return f"@{record['Tag'].lower().strip()}" if record.get("Tag") else None
+
+    @staticmethod
+    def _username(record: dict) -> str | None:
+        """ Normalize a member record to the username form stored in the whitelist. """
+
+        return record["Telegram Username"].lower().strip() if record.get("Telegram Username") else None
+
+    async def refresh(self) -> bool:
+        """ Bring the state up to date; returns whether anything changed. """
+
+        if self._last_full is None or time.monotonic() - self._last_full >= self.full_resync_interval:
+            await self._full_sync()
+            return True
+        return await self._delta_sync()
+
+    async def _full_sync(self) -> None:
+        """ Re-read every table and every link. """
+
+        members, *tag_tables = await asyncio.gather(self._members(), *[self._tag_records(kind) for kind in TAG_KINDS.values()])
+
+        tags = {
+            kind: {r["Id"]: self._tag_name(r) for r in records if self._tag_name(r)}
+            for kind, records in zip(TAG_KINDS.values(), tag_tables)
+        }
+        link_keys = [(kind, record_id) for kind, records in tags.items() for record_id in records]
+        link_results = await asyncio.gather(*[self._linked_ids(kind, record_id) for kind, record_id in link_keys])
+
+        # Swap in the new state only once every request succeeded
+        self.usernames = {r["Id"]: self._username(r) for r in members if self._username(r)}
+        self.tags = tags
+        self.links = dict(zip(link_keys, link_results))
+        self.watermarks = {}
+        self.seen = {}
+        self._newer("members", members)
+        for kind, records in zip(TAG_KINDS.values(), tag_tables):
+            self._newer(kind, records)
+        self._last_full = time.monotonic()
+
+        logging.info(f"modules/nocodb - Full membership sync: {len(self.usernames)} members, {len(self.links)} tags.")
+
+    async def _delta_sync(self) -> bool:
+        """ Apply the records changed since the last refresh. """
+
+        kinds = list(TAG_KINDS.values())
+        members, member_ids, *results = await asyncio.gather(
+            self._members(self._since("members")),
+            self._ids("members"),
+            *[self._tag_records(kind, self._since(kind)) for kind in kinds],
+            *[self._ids(kind) for kind in kinds]
+        )
+        tag_tables, tag_ids = results[:len(kinds)], results[len(kinds):]
+
+        # Work on copies and keep the old watermarks so a failed link fetch leaves the state untouched
+        watermarks, seen = dict(self.watermarks), dict(self.seen)
+        changed_members = self._newer("members", members)
+        changed_tags = {kind: self._newer(kind, records) for kind, records in zip(kinds, tag_tables)}
+
+        # Deletions and deactivations leave no UpdatedAt behind: they show up as Ids missing from the tables
+        removed_members = [member_id for member_id in self.usernames if member_id not in member_ids]
+        removed_tags = {kind: [record_id for record_id in self.tags[kind] if record_id not in ids] for kind, ids in zip(kinds, tag_ids)}
+
+        if not changed_members and not any(changed_tags.values()) and not removed_members and not any(removed_tags.values()):
+            return False
+
+        tags = {kind: dict(records) for kind, records in self.tags.items()}
+        for kind, record_ids in removed_tags.items():
+            for record_id in record_ids:
+                tags[kind].pop(record_id, None)
+        for kind, records in changed_tags.items():
+            for r in records:
+                if self._tag_name(r):
+                    tags[kind][r["Id"]] = self._tag_name(r)
+                else:
+                    tags[kind].pop(r["Id"], None)
+
+        # Re-read the links of the changed tag records, and of the tags the changed members belong to (they may have
+        # been unlinked from the member's side); links added from the member's side are picked up by the full resync
+        changed_member_ids = {r["Id"] for r in changed_members}
+        link_keys = {(kind, r["Id"]) for kind, records in changed_tags.items() for r in records if r["Id"] in tags[kind]}
+        link_keys.update(key for key, ids in self.links.items() if key[1] in tags[key[0]] and not changed_member_ids.isdisjoint(ids))
+        link_keys = list(link_keys)
+
+        try:
+            link_results = await asyncio.gather(*[self._linked_ids(kind, record_id) for kind, record_id in link_keys])
+        except Exception:
+            self.watermarks, self.seen = watermarks, seen
+            raise
+
+        for member_id in removed_members:
+            self.usernames.pop(member_id, None)
+        for r in changed_members:
+            if self._username(r):
+                self.usernames[r["Id"]] = self._username(r)
+            else:
+                self.usernames.pop(r["Id"], None)
+        self.tags = tags
+        self.links.update(zip(link_keys, link_results))
+        self.links = {key: ids for key, ids in self.links.items() if key[1] in tags[key[0]]}
+
+        logging.info(
+            f"modules/nocodb - Delta membership sync: {len(changed_members)} members and {sum(len(r) for r in changed_tags.values())} tags changed, "
+            f"{len(removed_members)} members and {sum(len(r) for r in removed_tags.values())} tags removed."
+        )
+        return True
+
+    def tag_cache(self) -> dict[str, list[str]]:
+        """ Return the tags of every kind, keyed like the bot's tag cache. """
+
+        return {key: list(self.tags[kind].values()) for key, kind in TAG_KINDS.items()}
+
+    def whitelist(self) -> dict[str, list[str]]:
+        """ Return the tag -> member usernames map; inactive members are not in the members view, so they drop out here. """
+
+        return {
+            tag: [self.usernames[member_id] for member_id in self.links.get((kind, record_id), []) if member_id in self.usernames]
+            for kind, records in self.tags.items()
+            for record_id, tag in records.items()
+        }
@@ -0,0 +1,59 @@
+import time
+import asyncio
+import logging
+from modules.metrics import cache_lookup
+
+class LabPresence:
+    """ Short-lived cache in front of EagleAPI.inlab that coalesces concurrent callers into one request. """
+
+    def __init__(self, eagle_api, directory=None, ttl: float = 5):
+        """ Initialize the cache; usernames are resolved through the member directory when one is given. """
+
+        self.eagle_api = eagle_api
+        self.directory = directory
+        self.ttl = ttl
+
+        self._value: dict | None = None  # Last result: {'count': n, 'people': [emails], 'usernames': [tags]}
+        self._fetched_at = 0.0
+        self._inflight: asyncio.Task | None = None  # The request currently shared by every waiting caller
+
+    @property
+    def fresh(self) -> bool:
+        """ Whether get() can answer from the cache without any network call. """
+
+        return self._value is not None and time.monotonic() - self._fetched_at < self.ttl
+
+    async def get(self) -> dict:
+        """ Return who is in the lab, from the cache if fresh, else from the in-flight request or a new one. """
+
+        cache_lookup("presence", self.fresh)
+        if self.fresh:
+            return self._value
+
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+
+        # Shield the shared request so one cancelled caller does not cancel it for the others
+        return await asyncio.shield(self._inflight)
+
+    async def _fetch(self) -> dict:
+        """ Call EagleAPI and resolve the emails to Telegram usernames. """
+
+        try:
+            # Call EagleAPI client; expected structure: {'people': [emails], 'count': n}
+            inlab_data = await self.eagle_api.inlab()
+
+            usernames = []
+            if self.directory and inlab_data['count']:
+                usernames = await asyncio.gather(*[self.directory.username_from_email(email) for email in inlab_data['people']])
+
+            self._value = {
+                "count": inlab_data['count'],
+                "people": inlab_data['people'],
+                "usernames": [username for username in usernames if username]
+            }
+            self._fetched_at = time.monotonic()
+            logging.info(f"modules/presence - Lab presence refreshed: {self._value['count']} people in the lab.")
+            return self._value
+        finally:
+            self._inflight = None
@@ -0,0 +1,139 @@
+""" Low-overhead runtime diagnostics: a sampling profiler, tracemalloc diffs and event-loop lag. """
+
+import io
+import sys
+import time
+import asyncio
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+
+# Upper bound for a single profiling run, in seconds
+MAX_PROFILE_SECONDS = 60
+
+_profile_lock = asyncio.Lock()  # One profiling run at a time
+_last_snapshot: tracemalloc.Snapshot | None = None  # Previous tracemalloc snapshot, diffed by the next one
+
+def _sample(seconds: float, interval: float) -> tuple[Counter, int]:
+    """ Sample the stack of every other thread for the given time; returns (collapsed stack counts, samples taken). """
+
+    me = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks = Counter()
+    samples = 0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(frames))] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return stacks, samples
+
+async def profile(seconds: float, interval: float = 0.005, top: int = 40) -> io.BytesIO:
+    """
+    Sample every thread's stack from a background thread while the bot keeps running, and return a text report:
+    the top stacks first, then every stack in collapsed format (usable with flamegraph.pl or speedscope).
+    """
+
+    seconds = max(1.0, min(seconds, MAX_PROFILE_SECONDS))
+    async with _profile_lock:
+        stacks, samples = await asyncio.to_thread(_sample, seconds, interval)
+
+    lines = [f"# {samples} samples over {seconds:.0f}s every {interval * 1000:.0f}ms", "", f"# Top {top} stacks (count, thread;outermost;...;innermost)"]
+    for stack, count in stacks.most_common(top):
+        lines.append(f"{count:>6} {stack}")
+    lines += ["", "# Collapsed stacks"]
+    lines += [f"{stack} {count}" for stack, count in stacks.most_common()]
+
+    logging.info(f"modules/profiler - Profiled {samples} samples over {seconds:.0f}s.")
+    return io.BytesIO("\n".join(lines).encode())
+
+def memory_diff(top: int = 15) -> str:
+    """ Take a tracemalloc snapshot and diff it against the previous one; the first call starts tracing. """
+
+    global _last_snapshot
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+        _last_snapshot = tracemalloc.take_snapshot()
+        return "tracemalloc started; run the command again to see what was allocated since now."
+
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"Traced: {current / 1024:.0f} KiB now, {peak / 1024:.0f} KiB peak"]
+    for stat in snapshot.compare_to(_last_snapshot, "lineno")[:top]:
+        lines.append(str(stat))
+    _last_snapshot = snapshot
+    return "\n".join(lines)
+
+def memory_stop() -> str:
+    """ Stop tracemalloc and drop the stored snapshot. """
+
+    global _last_snapshot
+
+    if not tracemalloc.is_tracing():
+        return "tracemalloc is not running."
+    tracemalloc.stop()
+    _last_snapshot = None
+    return "tracemalloc stopped."
+
+class LoopMonitor:
+    """ Measures event-loop lag: how late a periodic sleep wakes up compared to when it was due. """
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        """ Initialize the monitor; it keeps the last window measurements. """
+
+        self.interval = interval
+        self._lags: list[float] = []
+        self._window = window
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """ Start measuring in a background task. """
+
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """ Stop measuring. """
+
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        """ Sleep for the interval over and over, recording how much later than due each wake-up was. """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._lags.append(max(0.0, loop.time() - due))
+            del self._lags[:-self._window]
+
+    def report(self) -> str:
+        """ Return the lag statistics and the running asyncio tasks grouped by coroutine. """
+
+        tasks = asyncio.all_tasks()
+        by_coroutine = Counter(getattr(task.get_coro(), "__qualname__", type(task.get_coro()).__name__) for task in tasks)
+
+        lines = []
+        if self._lags:
+            lags = sorted(self._lags)
+            lines.append(
+                f"Loop lag over the last {len(lags) * self.interval:.0f}s: "
+                f"last {self._lags[-1] * 1000:.1f} ms, p50 {lags[len(lags) // 2] * 1000:.1f} ms, max {lags[-1] * 1000:.1f} ms"
+            )
+        else:
+            lines.append("Loop lag: no measurement yet.")
+        lines.append(f"Tasks: {len(tasks)}")
+        lines += [f"{count:>4} {name}" for name, count in by_coroutine.most_common(15)]
+        return "\n".join(lines)
@@ -1,15 +1,35 @@
-from pony.orm import Database, Required, Optional, Set, PrimaryKey, select
-import tomllib
+from pony.orm import Database, Required, Optional, Set, PrimaryKey, select, db_session
+from dataclasses import dataclass
+from modules.storage import offloaded, run
+from modules.config import get_config
 import logging
+import random
+import sqlite3
 import os
 
-# Load configuration from config.ini
-with open(os.getenv("CONFIG_PATH"), "rb") as f:
-    try:
-        config = tomllib.load(f)
-    except tomllib.TOMLDecodeError as e:
-        logging.error(f"modules/quiz - Error parsing data/config.ini: {e}")
-        exit(1)
+# Shared configuration, parsed once by modules/config; the sections read here only change on restart
+config = get_config()
+
+def _migrate(path: str) -> None:
+    """ Add the materialized validity columns to a Questions table created before they existed. """
+
+    if not os.path.exists(path):
+        return
+
+    with sqlite3.connect(path) as conn:
+        columns = {row[1] for row in conn.execute('PRAGMA table_info("Questions")')}
+        if not columns:
+            # Table not created yet; Pony will create it with every column
+            return
+
+        for column, sql_type in (("is_valid", "BOOLEAN"), ("correct_option", "INTEGER"), ("answer_count", "INTEGER")):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE "Questions" ADD COLUMN "{column}" {sql_type}')
+                logging.info(f"modules/quiz - Added column {column} to Questions table.")
+
+        conn.execute('CREATE INDEX IF NOT EXISTS "idx_questions__is_valid" ON "Questions" ("is_valid")')
+
+_migrate(config['Paths']['QuizDBPath'])
 
 # Create a Database object connected to a SQLite file.
 db = Database()
@@ -50,19 +70,36 @@ class Questions(db.Entity):
     answers = Set('Answers')  # A collection of possible answers for this question.
     images = Set('Images')  # A collection of images associated with this question.
     polls = Set('Polls')  # A collection of polls associated with this question.
+    is_valid = Optional(bool, index=True)  # Materialized result of refresh_validity(); None until validated.
+    correct_option = Optional(int)  # Index of the correct answer, with answers ordered by answer_id.
+    answer_count = Optional(int)  # Number of answers at the last validation.
 
-    def isValid(self):
+    def ordered_answers(self) -> list:
+        """ Return the answers in poll option order (by answer_id). """
+
+        return sorted(self.answers, key=lambda a: a.answer_id)
+
+    def refresh_validity(self) -> bool:
         """
-        Validates the question based on its answers.
+        Recompute and store the validity columns from the question's answers.
         A question is valid if it has:
             - Between 2 and 12 answers.
             - Exactly one correct answer.
             - All answer texts are 100 characters or less.
         """
 
-        if 2 <= self.answers.count() <= 12 and sum(1 for a in self.answers if a.is_correct) == 1 and all(len(a.answer_text) <= 100 for a in self.answers):
-            return True
-        return False
+        answers = self.ordered_answers()
+        correct = [i for i, a in enumerate(answers) if a.is_correct]
+
+        self.answer_count = len(answers)
+        self.correct_option = correct[0] if len(correct) == 1 else None
+        self.is_valid = 2 <= len(answers) <= 12 and len(correct) == 1 and all(len(a.answer_text) <= 100 for a in answers)
+        return self.is_valid
+
+    def isValid(self):
+        """ Return the stored validity of the question. """
+
+        return bool(self.is_valid)
 
 class Answers(db.Entity):
     """ Represents a single answer to a question. """
@@ -79,6 +116,19 @@ class Images(db.Entity):
     path = Required(str)  # The file path or URL to the image.
     question = Required(Questions)  # The question this image is associated with.
 
+class ImageFileIds(db.Entity):
+    """ Caches the Telegram file_id returned the first time an image is sent. """
+
+    path = PrimaryKey(str)  # The image path, as stored in Images.path.
+    file_id = Required(str)  # The Telegram file_id of the uploaded photo.
+
+class MirroredImages(db.Entity):
+    """ Tracks images mirrored to the data volume and their Telegram-ready variant. """
+
+    path = PrimaryKey(str)  # The image path, as stored in Images.path.
+    sha256 = Required(str)  # Hash of the downloaded original, used to skip unchanged images.
+    local_file = Required(str)  # Location of the resized variant on the data volume.
+
 class Polls(db.Entity):
     """ Represents a mapping between Telegram poll IDs and quiz questions. """
 
@@ -94,3 +144,247 @@ class Areas(db.Entity):
     
 # Generate mapping between the above entities and the actual database tables.
 db.generate_mapping(create_tables=True)
+
+class QuestionIndex:
+    """ In-memory index of valid question keys, used for O(1) random draws. """
+
+    def __init__(self):
+        """ Initialize an empty index. """
+
+        self.by_area: dict[str, list[tuple[int, int]]] = {}  # Area code -> valid (id, quiz_id) keys
+        self.all: list[tuple[int, int]] = []  # Every valid (id, quiz_id) key
+
+    def rebuild(self) -> None:
+        """ Rebuild the index from the quiz database. Call again whenever the quiz DB changes. """
+
+        by_area: dict[str, list[tuple[int, int]]] = {}
+
+        with db_session:
+            all_keys = list(select((q.id, q.quiz.quiz_id) for q in Questions if q.is_valid))
+            for question_id, quiz_id, area_name in select((q.id, q.quiz.quiz_id, a.name) for q in Questions for a in q.areas if q.is_valid):
+                by_area.setdefault(area_name, []).append((question_id, quiz_id))
+
+        # Swap in the new arrays in one step so readers never see a half-built index
+        self.by_area, self.all = by_area, all_keys
+
+        logging.info(f"modules/quiz - Question index rebuilt: {len(all_keys)} valid questions in {len(by_area)} areas.")
+
+    def random(self, area_code: str = None) -> tuple[int, int] | None:
+        """ Return a random valid (id, quiz_id) key, optionally restricted to an area, or None if there is none. """
+
+        keys = self.by_area.get(area_code, []) if area_code else self.all
+        if not keys:
+            return None
+        return keys[random.randrange(len(keys))]
+
+def validate_questions() -> list[tuple[int, int]]:
+    """ Recompute the validity columns of every question in a single transaction and return the invalid (id, quiz_id) keys. """
+
+    invalid = []
+    with db_session:
+        for question in Questions.select().prefetch(Questions.answers):
+            if not question.refresh_validity():
+                invalid.append((question.id, question.quiz.quiz_id))
+        total = Questions.select().count()
+
+    logging.info(f"modules/quiz - Validated {total} questions, {len(invalid)} invalid.")
+    return invalid
+
+# Validate questions imported since the last run, then build the question index once at startup
+with db_session:
+    needs_validation = Questions.exists(lambda q: q.is_valid is None)
+if needs_validation:
+    validate_questions()
+
+question_index = QuestionIndex()
+question_index.rebuild()
+
+# Async access helpers: each runs on the storage pool and returns plain snapshots, never entities,
+# so callers can do network I/O without holding a db_session open.
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    """ Read-only copy of a question with everything needed to send it. """
+
+    id: int
+    quiz_id: int
+    text: str
+    type: str
+    areas: tuple[str, ...]
+    answers: tuple[tuple[str, bool], ...]  # (answer_text, is_correct) in poll option order
+    images: tuple[str, ...]  # Image paths relative to img.fs-quiz.eu
+    is_valid: bool
+    correct_option: int | None
+
+    @property
+    def options(self) -> list[str]:
+        """ Poll option texts in order. """
+
+        return [text for text, _ in self.answers]
+
+@dataclass(frozen=True)
+class PollSnapshot:
+    """ Read-only copy of a sent poll and the question it belongs to. """
+
+    question_id: int
+    quiz_id: int
+    correct_option: int
+    areas: tuple[str, ...]
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    """ Read-only copy of a quiz. """
+
+    quiz_id: int
+    year: str
+    class_: str
+    date: str
+    information: str
+
+@dataclass(frozen=True)
+class EventSnapshot:
+    """ Read-only copy of an event. """
+
+    event_id: int
+    short_name: str
+    event_name: str
+    country: str
+    website: str
+
+def _question_snapshot(question: Questions) -> QuestionSnapshot:
+    """ Copy a question entity into a snapshot; must be called inside a db_session. """
+
+    return QuestionSnapshot(
+        id=question.id,
+        quiz_id=question.quiz.quiz_id,
+        text=question.text,
+        type=question.type,
+        areas=tuple(area.name for area in question.areas),
+        answers=tuple((a.answer_text, a.is_correct) for a in question.ordered_answers()),
+        images=tuple(img.path for img in question.images),
+        is_valid=bool(question.is_valid),
+        correct_option=question.correct_option
+    )
+
+@offloaded
+def get_question(question_id: int, quiz_id: int) -> QuestionSnapshot | None:
+    """ Fetch a question by its composite key. """
+
+    question = Questions.get(id=question_id, quiz=quiz_id)
+    return _question_snapshot(question) if question else None
+
+async def random_question(area_code: str = None) -> QuestionSnapshot | None:
+    """ Draw a random valid question, optionally from an area, using the question index. """
+
+    key = question_index.random(area_code)
+    if not key:
+        return None
+    return await get_question(*key)
+
+@offloaded
+def save_poll(poll_id: str, question_id: int, quiz_id: int, correct_option: int) -> None:
+    """ Store the mapping between a Telegram poll and its question. """
+
+    Polls(poll_id=poll_id, question=Questions.get(id=question_id, quiz=quiz_id), correct_option=correct_option)
+
+@offloaded
+def get_poll(poll_id: str) -> PollSnapshot | None:
+    """ Fetch a stored poll mapping. """
+
+    poll = Polls.get(poll_id=poll_id)
+    if poll is None:
+        return None
+    return PollSnapshot(
+        question_id=poll.question.id,
+        quiz_id=poll.question.quiz.quiz_id,
+        correct_option=poll.correct_option,
+        areas=tuple(area.name for area in poll.question.areas)
+    )
+
+def _quiz_snapshot(quiz: Quiz) -> QuizSnapshot:
+    """ Copy a quiz entity into a snapshot; must be called inside a db_session. """
+
+    return QuizSnapshot(quiz_id=quiz.quiz_id, year=quiz.year, class_=quiz.class_, date=quiz.date, information=quiz.information)
+
+@offloaded
+def get_quiz(quiz_id) -> QuizSnapshot | None:
+    """ Fetch a quiz by ID. """
+
+    quiz = Quiz.get(quiz_id=quiz_id)
+    return _quiz_snapshot(quiz) if quiz else None
+
+@offloaded
+def list_quizzes() -> list[QuizSnapshot]:
+    """ Fetch all quizzes ordered by ID. """
+
+    return [_quiz_snapshot(q) for q in Quiz.select().order_by(Quiz.quiz_id)]
+
+def _event_snapshot(event: Events) -> EventSnapshot:
+    """ Copy an event entity into a snapshot; must be called inside a db_session. """
+
+    return EventSnapshot(event_id=event.event_id, short_name=event.short_name, event_name=event.event_name, country=event.country, website=event.website)
+
+@offloaded
+def get_event(event_id) -> EventSnapshot | None:
+    """ Fetch an event by ID. """
+
+    event = Events.get(event_id=event_id)
+    return _event_snapshot(event) if event else None
+
+@offloaded
+def list_events() -> list[EventSnapshot]:
+    """ Fetch all events ordered by ID. """
+
+    return [_event_snapshot(e) for e in Events.select().order_by(Events.event_id)]
+
+@offloaded
+def get_file_ids(paths: list[str]) -> dict[str, str]:
+    """ Return the cached Telegram file_ids for the given image paths. """
+
+    return {entry.path: entry.file_id for entry in ImageFileIds.select(lambda e: e.path in paths)}
+
+@offloaded
+def save_file_ids(file_ids: dict[str, str]) -> None:
+    """ Store or replace the Telegram file_ids of the given image paths. """
+
+    for path, file_id in file_ids.items():
+        if entry := ImageFileIds.get(path=path):
+            entry.file_id = file_id
+        else:
+            ImageFileIds(path=path, file_id=file_id)
+
+@offloaded
+def forget_file_ids(paths: list[str]) -> None:
+    """ Drop cached Telegram file_ids, e.g. after Telegram rejected them. """
+
+    ImageFileIds.select(lambda e: e.path in paths).delete(bulk=True)
+
+@offloaded
+def image_paths() -> list[str]:
+    """ Return every distinct image path referenced by a question. """
+
+    return sorted(set(select(img.path for img in Images)))
+
+@offloaded
+def get_mirrored(paths: list[str] = None) -> dict[str, tuple[str, str]]:
+    """ Return path -> (sha256, local_file) for mirrored images, optionally restricted to the given paths. """
+
+    query = MirroredImages.select(lambda m: m.path in paths) if paths is not None else MirroredImages.select()
+    return {m.path: (m.sha256, m.local_file) for m in query}
+
+@offloaded
+def save_mirrored(path: str, sha256: str, local_file: str) -> None:
+    """ Record a mirrored image and its variant. """
+
+    if entry := MirroredImages.get(path=path):
+        entry.sha256 = sha256
+        entry.local_file = local_file
+    else:
+        MirroredImages(path=path, sha256=sha256, local_file=local_file)
+
+async def revalidate() -> list[tuple[int, int]]:
+    """ Revalidate every question and rebuild the question index, off the event loop. """
+
+    invalid = await run(validate_questions)
+    await run(question_index.rebuild)
+    return invalid
@@ -0,0 +1,72 @@
+import logging
+import asyncio
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from modules.metrics import timed_job
+from modules.nocodb import PartialWriteError
+
+class QuizAnswerBuffer:
+    """ Aggregates quiz answers per username and writes them to NocoDB in batches. """
+
+    def __init__(self, nocodb, interval: int = 60, batch_size: int = 50):
+        """ Initialize the buffer and schedule its periodic flush. """
+
+        self.nocodb = nocodb
+        self.batch_size = batch_size
+
+        self._pending: dict[str, list[int]] = {}  # Username -> [answered, correct] deltas not yet written
+        self._pending_count = 0  # Number of answers buffered since the last flush
+        self._lock = asyncio.Lock()  # Serializes flushes so NocoDB read-modify-writes never overlap
+        self._flush_task = None
+
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(self.flush, 'interval', seconds=interval)
+        self._scheduler.start()
+
+        logging.info(f"modules/quiz_log - Quiz answer buffer initialized, flushing every {interval}s or {batch_size} answers.")
+
+    def add(self, username: str, is_correct: bool) -> None:
+        """ Buffer a single answer; triggers an early flush when the batch size is reached. """
+
+        entry = self._pending.setdefault(username, [0, 0])
+        entry[0] += 1
+        entry[1] += 1 if is_correct else 0
+        self._pending_count += 1
+
+        if self._pending_count >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    @timed_job("quiz_log_flush")
+    async def flush(self) -> None:
+        """ Write all buffered deltas to NocoDB; failed batches are merged back for the next flush. """
+
+        async with self._lock:
+            if not self._pending:
+                return
+
+            batch, self._pending = self._pending, {}
+            count, self._pending_count = self._pending_count, 0
+
+            try:
+                await self.nocodb.quiz_answer_log_bulk({username: tuple(delta) for username, delta in batch.items()})
+            except Exception as e:
+                # Users whose stats were already written are dropped from the batch so they are not counted twice
+                written = e.written if isinstance(e, PartialWriteError) else frozenset()
+                failed = {username: delta for username, delta in batch.items() if username not in written}
+                failed_count = sum(answered for answered, _ in failed.values())
+                logging.error(f"modules/quiz_log - Failed to flush {failed_count} of {count} quiz answers to NocoDB, retrying later: {e}")
+
+                # Merge the failed part of the batch back into whatever arrived in the meantime
+                for username, (answered, correct) in failed.items():
+                    entry = self._pending.setdefault(username, [0, 0])
+                    entry[0] += answered
+                    entry[1] += correct
+                self._pending_count += failed_count
+                return
+
+        logging.info(f"modules/quiz_log - Flushed {count} quiz answers for {len(batch)} users to NocoDB.")
+
+    async def close(self) -> None:
+        """ Stop the periodic flush and drain the buffer. """
+
+        self._scheduler.shutdown(wait=False)
+        await self.flush()
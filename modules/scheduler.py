@@ -1,78 +1,58 @@
 import logging
-from pony.orm import db_session
-from modules.quiz import Questions, Polls
-from telegram import InputMediaPhoto
+from modules.quiz import random_question, save_poll
+from modules.media import send_images
+import functools
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from modules.metrics import timed_job
 
+@timed_job("scheduled_question")
 async def send_scheduled_question(bot, group_id, thread_id, area_code):
     """ Fetches a random question and sends it to the specified group and thread. """
 
-    with db_session:
+    question = await random_question(area_code)
+    if not question:
+        logging.warning(f"modules/scheduler - No valid question available in area {area_code}; skipping send to group {group_id} in thread {thread_id}.")
+        return
 
-        question = Questions.select(
-            lambda q: area_code in (area.name for area in q.areas)
-        ).random(1)[0]
-        while not question.isValid():
-            question = Questions.select(
-                lambda q: area_code in (area.name for area in q.areas)
-            ).random(1)[0]
+    qtext = f"Question {question.id}-{question.quiz_id} {question.type} | {area_code}"
 
-        answers = list(question.answers)
-        images = list(question.images)
-    
-        qtext = f"Question {question.id}-{question.quiz.quiz_id} {question.type} | {area_code}"
-
-        options = [a.answer_text for a in answers]
-        correct_indices = [i for i, a in enumerate(answers) if a.is_correct]
+    options = question.options
+    correct_option = question.correct_option
 
-        if not options or not correct_indices:
-            logging.warning(f"modules/scheduler - Question {question.id}-{question.quiz.quiz_id} has no answers or correct answer defined.")
-            return
-        
-        # Send question text and any associated images
-        if len(images) == 1:
-            await bot.send_photo(
-                chat_id=group_id,
-                message_thread_id=thread_id,
-                photo=f"https://img.fs-quiz.eu/{images[0].path}", caption=f"{question.text}"
-            )
-        elif len(images) > 1:
-            media_group = [
-                InputMediaPhoto(media=f"https://img.fs-quiz.eu/{img.path}")
-                for img in images
-            ]
-            await bot.send_media_group(
-                chat_id=group_id,
-                message_thread_id=thread_id,
-                media=media_group
-            )
-            await bot.send_message(
-                chat_id=group_id,
-                message_thread_id=thread_id,
-                text=f"{question.text}"
-            )
-        else:
-            await bot.send_message(
-                chat_id=group_id,
-                message_thread_id=thread_id,
-                text=f"{question.text}"
-            )
-
-        logging.info(f"modules/scheduler - Scheduled question {question.id}-{question.quiz.quiz_id} | {area_code} sent to group {group_id} in thread {thread_id}.")
-        
-        # Send the poll with the question options
-        message = await bot.send_poll(
+    if not options or correct_option is None:
+        logging.warning(f"modules/scheduler - Question {question.id}-{question.quiz_id} has no answers or correct answer defined.")
+        return
+    
+    # Send any associated images (a single image carries the question text as caption), then the text itself
+    if question.images:
+        await send_images(
+            question.images,
+            functools.partial(bot.send_photo, chat_id=group_id, message_thread_id=thread_id),
+            functools.partial(bot.send_media_group, chat_id=group_id, message_thread_id=thread_id),
+            caption=f"{question.text}"
+        )
+    if len(question.images) != 1:
+        await bot.send_message(
             chat_id=group_id,
             message_thread_id=thread_id,
-            question=qtext,
-            options=options,
-            type="quiz",
-            correct_option_id=correct_indices[0],
-            is_anonymous=True,
+            text=f"{question.text}"
         )
 
-        # Store the mapping between the poll ID and the question in the database
-        Polls(poll_id=message.poll.id, question=question, correct_option=correct_indices[0])
+    logging.info(f"modules/scheduler - Scheduled question {question.id}-{question.quiz_id} | {area_code} sent to group {group_id} in thread {thread_id}.")
+    
+    # Send the poll with the question options
+    message = await bot.send_poll(
+        chat_id=group_id,
+        message_thread_id=thread_id,
+        question=qtext,
+        options=options,
+        type="quiz",
+        correct_option_id=correct_option,
+        is_anonymous=True,
+    )
+
+    # Store the mapping between the poll ID and the question in the database
+    await save_poll(message.poll.id, question.id, question.quiz_id, correct_option)
 
     return
 
@@ -81,6 +61,7 @@ def setup_scheduler(application):
 
     scheduler = AsyncIOScheduler()
     config = application.bot_data["config"]
+    application.bot_data["question_scheduler"] = scheduler
 
     gen_scheduler(scheduler, application, 'Engineering', config)
     gen_scheduler(scheduler, application, 'Operations', config)
@@ -90,6 +71,19 @@ def setup_scheduler(application):
 
     return
 
+def reschedule(application) -> None:
+    """Replaces every scheduled question job with the ones in the current [ScheduledQuestions] config."""
+
+    scheduler = application.bot_data["question_scheduler"]
+    config = application.bot_data["config"]
+
+    scheduler.remove_all_jobs()
+    gen_scheduler(scheduler, application, 'Engineering', config)
+    gen_scheduler(scheduler, application, 'Operations', config)
+    logging.info("modules/scheduler - Scheduled questions reloaded.")
+
+    return
+
 def gen_scheduler(scheduler, application, division, config) -> None:
     """Generates scheduled jobs for a specific division based on configuration."""
         
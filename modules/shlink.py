@@ -1,26 +1,24 @@
-import requests
+from modules.http import new_client
 import qrcode
 import io
 
 class ShlinkAPI:
-    """ Simple API client that keeps a persistent requests.Session. """
+    """ Simple async API client that keeps a persistent pooled httpx.AsyncClient. """
     def __init__(self, base_url: str, api_key: str):
         """ Initialize the ShlinkAPI client with the given base URL. """
 
         # Normalize base_url by removing any trailing slash so later joins are consistent
         self.base_url = base_url.rstrip("/")
 
-        # Create a Session to reuse TCP connections and carry default headers/cookies
-        self._session = requests.Session()
-
-        # Set default headers for JSON APIs. Individual requests can override this.
-        self._session.headers.update({
+        # Create a pooled client to reuse TCP connections and carry default headers.
+        # Individual requests can override these headers.
+        self._session = new_client("shlink", headers={
             'X-Api-Key': api_key,
             'Content-Type': 'application/json'
         })
 
     def generate_qr_code(self, url: str) -> io.BytesIO:
-        """ Generate a QR code for the given URL. """
+        """ Generate a QR code for the given URL. CPU-bound: run it off the event loop. """
 
         img = qrcode.make(url)
         
@@ -31,7 +29,7 @@ class ShlinkAPI:
         return buf
 
         
-    def generate_short_url(self, url: str, custom_code: str = None) -> str:
+    async def generate_short_url(self, url: str, custom_code: str = None) -> str:
         """ Generate a short URL for the given URL, optionally with a custom code. """
 
         payload = {
@@ -40,8 +38,13 @@ class ShlinkAPI:
         if custom_code:
             payload["customSlug"] = custom_code
 
-        response = self._session.post(f"{self.base_url}/rest/v3/short-urls", json=payload)
+        response = await self._session.post(f"{self.base_url}/rest/v3/short-urls", json=payload)
         response.raise_for_status()
 
         data = response.json()
-        return data['shortUrl']
\ No newline at end of file
+        return data['shortUrl']
+
+    async def aclose(self) -> None:
+        """ Close the underlying connection pool. """
+
+        await self._session.aclose()
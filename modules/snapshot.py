@@ -0,0 +1,28 @@
+import os
+import json
+import time
+import logging
+
+def load_snapshot(path: str) -> dict | None:
+    """ Load a cache snapshot written by save_snapshot, or None if it is missing or unreadable. """
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"modules/snapshot - Ignoring unreadable cache snapshot {path}: {e}")
+        return None
+
+    age = time.time() - snapshot.get("saved_at", 0)
+    logging.info(f"modules/snapshot - Loaded cache snapshot {path} ({int(age)}s old).")
+    return snapshot
+
+def save_snapshot(path: str, data: dict) -> None:
+    """ Atomically write a cache snapshot, so a crash mid-write never leaves a truncated file behind. """
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({**data, "saved_at": time.time()}, f)
+    os.replace(tmp_path, path)
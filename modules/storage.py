@@ -0,0 +1,25 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pony.orm import db_session
+
+# Bounded pool so blocking Pony/SQLite work never runs on the event loop thread
+MAX_WORKERS = 4
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="storage")
+
+async def run(func, *args, **kwargs):
+    """ Run a blocking callable on the storage pool and await its result. """
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+def offloaded(func):
+    """ Decorator turning a blocking database function into a coroutine that runs inside its own db_session on the storage pool. """
+
+    session_func = db_session(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run(session_func, *args, **kwargs)
+
+    return wrapper
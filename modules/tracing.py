@@ -0,0 +1,77 @@
+""" Per-request tracing of outbound HTTP calls, tied to the Telegram update that caused them. """
+
+import re
+import time
+import logging
+from collections import deque
+from dataclasses import dataclass
+import httpx
+from modules.logs import current_update
+
+# Calls slower than this are logged as they complete; set from [Settings] SlowCallMs at startup
+SLOW_CALL_MS = 1000
+
+# Recent traces kept in memory for /traces
+MAX_TRACES = 500
+
+# Path segments replaced by a placeholder so calls to the same endpoint share one template
+_ID_SEGMENT = re.compile(r"^(?:\d+|(?=[A-Za-z0-9_-]{8,}$)[A-Za-z0-9_-]*\d[A-Za-z0-9_-]*|[^/]+@[^/]+)$")
+
+@dataclass(frozen=True)
+class Trace:
+    """ One completed outbound call. """
+
+    backend: str
+    method: str
+    path: str  # Templated path, without the query string
+    status: int
+    bytes: int
+    duration_ms: float
+    update_id: int | None  # Telegram update being handled when the call was made, None for background jobs
+    handler: str | None
+    started_at: float  # Wall-clock time the call started
+
+_traces: deque[Trace] = deque(maxlen=MAX_TRACES)
+
+def template_path(path: str) -> str:
+    """ Replace ids, table/link hashes and emails in a URL path with '{id}'. """
+
+    return "/".join("{id}" if segment and _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+def record(backend: str, method: str, path: str, status: int, size: int, duration_ms: float, started_at: float) -> None:
+    """ Store a trace and log it if it was slow. """
+
+    update = current_update()
+    trace = Trace(backend, method, path, status, size, round(duration_ms, 1), *(update or (None, None)), started_at)
+    _traces.append(trace)
+
+    if duration_ms >= SLOW_CALL_MS:
+        origin = f"update {trace.update_id} {trace.handler}" if trace.update_id is not None else "background"
+        logging.warning(f"modules/tracing - Slow call: {method} {backend} {path} {status} {size} B in {trace.duration_ms} ms ({origin})")
+
+def hooks(backend: str) -> dict:
+    """ Return httpx event hooks that trace every request of a client under the backend label. """
+
+    async def on_request(request: httpx.Request) -> None:
+        request.extensions["trace_start"] = (time.perf_counter(), time.time())
+
+    async def on_response(response: httpx.Response) -> None:
+        # Read the body here so its size and download time are part of the trace; callers reuse the buffered body
+        await response.aread()
+        start, started_at = response.request.extensions.get("trace_start", (time.perf_counter(), time.time()))
+        record(
+            backend,
+            response.request.method,
+            template_path(response.request.url.path),
+            response.status_code,
+            len(response.content),
+            (time.perf_counter() - start) * 1000,
+            started_at
+        )
+
+    return {"request": [on_request], "response": [on_response]}
+
+def slowest(limit: int = 10) -> list[Trace]:
+    """ Return the slowest recent traces, slowest first. """
+
+    return sorted(_traces, key=lambda trace: trace.duration_ms, reverse=True)[:limit]
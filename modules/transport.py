@@ -0,0 +1,147 @@
+import time
+import random
+import asyncio
+import logging
+import httpx
+
+class CircuitOpenError(Exception):
+    """ Raised when a request is refused because the backend's circuit breaker is open. """
+
+class CircuitBreaker:
+    """ Stops calling a backend after repeated failures and lets a single trial request through after a cooldown. """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """ Initialize a closed breaker that opens after failure_threshold consecutive failures. """
+
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """ Return whether a request may be sent now. """
+
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+            logging.info(f"modules/transport - Circuit breaker for {self.name} half-open, sending a trial request.")
+
+        # Half-open: exactly one trial request at a time
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """ Record a successful request, closing the breaker if it was probing. """
+
+        if self.state != self.CLOSED:
+            logging.info(f"modules/transport - Circuit breaker for {self.name} closed, backend recovered.")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """ Record a failed request, opening the breaker past the threshold or when a trial fails. """
+
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logging.warning(f"modules/transport - Circuit breaker for {self.name} opened after {self.consecutive_failures} consecutive failures.")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+class ResilientTransport:
+    """ Sends requests through an httpx.AsyncClient with a concurrency cap, jittered exponential retries and a circuit breaker. """
+
+    # Responses worth retrying: rate limiting and server-side failures
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    # Methods that can be repeated without changing the result; others (POST, PATCH) may have been applied
+    # by the server even when the response was lost, so they are only retried when marked retry-safe
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+    def __init__(self, client: httpx.AsyncClient, breaker: CircuitBreaker, max_concurrency: int = 8, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 10.0):
+        """ Wrap a client; at most max_concurrency requests are in flight at once. """
+
+        self.client = client
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _delay(self, attempt: int, response: httpx.Response | None) -> float:
+        """ Return how long to wait before the next attempt: Retry-After if the server sent one, else full-jitter exponential backoff. """
+
+        if response is not None and response.headers.get("Retry-After", "").isdigit():
+            return min(float(response.headers["Retry-After"]), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method: str, url: str, retry_safe: bool = None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transport errors, 429 and 5xx responses if the method is idempotent or retry_safe is set.
+        Raises CircuitOpenError while the backend is considered down.
+        """
+
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.breaker.name} circuit breaker is open")
+
+        retries = self.max_retries if (method.upper() in self.IDEMPOTENT_METHODS if retry_safe is None else retry_safe) else 0
+
+        # Every path out of here records an outcome, so a half-open trial slot is always released:
+        # anything other than a success (errors, cancellation, undecodable bodies) counts as a failure
+        succeeded = False
+        try:
+            for attempt in range(retries + 1):
+                error, response = None, None
+                try:
+                    async with self._semaphore:
+                        response = await self.client.request(method, url, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+                else:
+                    if response.status_code not in self.RETRY_STATUSES:
+                        # Any other answer, including 4xx, means the backend is up
+                        succeeded = True
+                        self.breaker.record_success()
+                        return response
+
+                if attempt < retries:
+                    await asyncio.sleep(self._delay(attempt, response))
+
+            if error:
+                raise error
+            return response
+        finally:
+            if not succeeded:
+                self.breaker.record_failure()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """ Send a GET request. """
+
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """ Send a POST request. """
+
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        """ Send a PATCH request. """
+
+        return await self.request("PATCH", url, **kwargs)
@@ -0,0 +1,60 @@
+import asyncio
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently on a bounded number of workers while keeping the updates of the same chat
+    (and forum thread) in arrival order. Poll answers carry no chat and are ordered per user instead.
+    """
+
+    def __init__(self, workers: int, max_pending: int = 256):
+        """ Run at most workers updates at once; at most max_pending updates may be accepted and waiting. """
+
+        # The base semaphore only bounds accepted updates; workers are taken after the chat lock so a burst
+        # in one chat queues behind its own lock instead of occupying every worker
+        super().__init__(max_concurrent_updates=max(max_pending, workers))
+        self._workers = asyncio.Semaphore(workers)
+        self._locks: dict[tuple, asyncio.Lock] = {}  # Ordering key -> lock held by the update being processed
+        self._waiting: dict[tuple, int] = {}  # Ordering key -> updates holding or waiting for its lock
+
+    @staticmethod
+    def _key(update: object) -> tuple | None:
+        """ Return the key whose updates must be processed in order, or None if the update can run freely. """
+
+        if not isinstance(update, Update):
+            return None
+        if update.poll_answer and update.poll_answer.user:
+            return ("user", update.poll_answer.user.id)
+        if update.effective_chat:
+            thread_id = update.effective_message.message_thread_id if update.effective_message else None
+            return ("chat", update.effective_chat.id, thread_id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        """ Wait for the earlier updates of the same chat, then run this one on a free worker. """
+
+        key = self._key(update)
+        if key is None:
+            async with self._workers:
+                await coroutine
+            return
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._workers:
+                    await coroutine
+        finally:
+            # Drop the lock once nobody holds or waits for it so idle chats do not accumulate
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        """ Nothing to set up. """
+
+    async def shutdown(self) -> None:
+        """ Nothing to tear down. """
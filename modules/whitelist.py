@@ -1,25 +1,75 @@
+import re
 import logging
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import asyncio
+import sys
+from modules.snapshot import save_snapshot
+from modules.nocodb import MembershipSync
+from modules.transport import CircuitOpenError
+from modules.metrics import timed_job
+
+# Config groups in [Whitelist] whose allowed users are precomputed on every refresh
+PERMISSION_GROUPS = ("General", "Quiz")
+
+class TagMatcher:
+    """ Precompiled matcher that finds the known tags mentioned in a text and resolves each to its kind. """
+
+    # Tags handled by the bot itself rather than by NocoDB membership; they win over a NocoDB tag of the same name
+    SPECIAL_TAGS = {"@inlab": "inlab"}
+
+    def __init__(self, tag_cache: dict[str, list[str]]):
+        """ Build the tag -> kind map and a single regex alternation over every tag. """
+
+        self.kinds: dict[str, str] = {}
+        for kind, tags in tag_cache.items():
+            for tag in tags:
+                self.kinds.setdefault(tag, kind)
+        self.kinds.update(self.SPECIAL_TAGS)
+
+        # Longest names first so a tag never shadows a longer one sharing its prefix; a tag must not continue into
+        # another name character, but a trailing '.' (end of sentence) is allowed
+        names = sorted((re.escape(tag[1:]) for tag in self.kinds), key=len, reverse=True)
+        self._pattern = re.compile(r"@(?:" + "|".join(names) + r")(?![\w-]|\.[\w-])")
+
+    def scan(self, text: str) -> dict[str, str]:
+        """ Return the known tags found in the text, in order of first appearance, mapped to their kind. """
+
+        # Most messages mention nobody: reject them with a plain substring scan before touching the regex
+        if "@" not in text:
+            return {}
+
+        return {match: self.kinds[match] for match in self._pattern.findall(text.lower())}
 
 class Whitelist:
     """ Manages user whitelisting based on tags from NocoDB. """
     
-    def __init__(self, application):
-        """ Initialize the Whitelist with tag cache and NocoDB client. """
+    def __init__(self, application, snapshot_path: str = None, snapshot: dict = None):
+        """ Initialize the Whitelist with tag cache and NocoDB client, warm-started from a snapshot if one is given. """
 
-        self.whitelist: dict[str, list[str]] = {}
+        self.whitelist: dict[str, tuple[str, ...]] = {}  # Tag -> members, as compact tuples of interned usernames
+        self.groups: dict[str, frozenset[str]] = {}  # Config group -> every allowed username
         self.tag_cache = application.bot_data['tag_cache']
         self.nocodb = application.bot_data['nocodb']
+        self.sync = MembershipSync(self.nocodb, full_resync_interval=application.bot_data['config']['Whitelist'].get('FullResyncMinutes', 30) * 60)
+        self.group_config = {group: application.bot_data['config']['Whitelist'].get(group, []) for group in PERMISSION_GROUPS}
+        self.snapshot_path = snapshot_path
+        self.matcher = TagMatcher({})  # Rebuilt whenever the set of known tags changes
+        self._matcher_tags: frozenset[str] = frozenset()
+        self.generation = 0  # Bumped on every membership swap so per-user decisions cached elsewhere can be dropped
+        self._refreshing = asyncio.Lock()  # Refreshes that would overlap a running one are skipped
+
+        # Serve the snapshot (possibly stale) right away; without one, start empty so literal usernames in the config already work
+        self._apply(snapshot or {})
         
-        # run first cache update
-        asyncio.create_task(self._update_cache())
+        # run first cache update in the background (stale-while-revalidate)
+        self._refresh_task = asyncio.create_task(self._update_cache())
 
         scheduler = AsyncIOScheduler()
 
         cron = application.bot_data['config']['Whitelist']['cron']
 
-        scheduler.add_job(
+        self.cron = cron
+        self._job = scheduler.add_job(
             self._update_cache,
             'cron',
             **{field: value for field, value in zip(['minute', 'hour', 'day', 'month', 'day_of_week'], cron.split())}
@@ -29,59 +79,103 @@ class Whitelist:
 
         logging.info("modules/whitelist - Whitelist initialized and refresh scheduled with cron: " + cron)
         
+    @timed_job("whitelist_refresh")
     async def _update_cache(self) -> None:
         """ Update the whitelist cache from NocoDB. """
 
-        tasks = []
-        tag_map = []
+        if self._refreshing.locked():
+            return
 
-        tag_types = {
-            "areas": "area",
-            "workgroups": "workgroup",
-            "projects": "project",
-            "roles": "role"
-        }
-
-        for tag_key, tag_type in tag_types.items():
-            for tag in self.tag_cache.get(tag_key, []):
-                tasks.append(self.nocodb.members(tag.lstrip("@"), tag_type))
-                tag_map.append(tag)
+        # Fetch only what changed since the last refresh (periodically a full resync)
+        try:
+            async with self._refreshing:
+                changed = await self.sync.refresh()
+        except CircuitOpenError:
+            logging.warning("modules/whitelist - NocoDB circuit breaker is open, keeping cached data.")
+            return
+        except Exception as e:
+            logging.error(f"modules/whitelist - Whitelist refresh failed, keeping cached data: {e}")
+            return
 
-        results = await asyncio.gather(*tasks)
+        if not changed:
+            return
 
-        new_whitelist = dict(zip(tag_map, results))
+        tag_cache = self.sync.tag_cache()
+        new_whitelist = self.sync.whitelist()
 
-        # Create @everyone by merging all members from all tags
-        all_members = set()
-        for member_list in new_whitelist.values():
-            all_members.update(member_list)
-        new_whitelist["@everyone"] = list(all_members)
+        # Update the shared tag cache in place so every holder of the dict sees the new tags
+        self.tag_cache.clear()
+        self.tag_cache.update(tag_cache)
 
-        self.whitelist = new_whitelist
+        self._apply(new_whitelist)
 
         logging.info("modules/whitelist - Whitelist cache updated from NocoDB.")
 
-        return
+        # Persist the fresh data so the next boot can serve it immediately
+        if self.snapshot_path:
+            try:
+                await asyncio.to_thread(save_snapshot, self.snapshot_path, {"tag_cache": tag_cache, "whitelist": new_whitelist})
+            except OSError as e:
+                logging.warning(f"modules/whitelist - Failed to write cache snapshot: {e}")
 
-    def is_user_whitelisted(self, username: str, tags: list[str]) -> bool:
-        """ Check if a user is whitelisted for any of the provided tags. """
+        return
 
-        # Put a @ before username to match tag format
-        username = "@" + username.lower()
+    def _apply(self, new_whitelist: dict[str, list[str]]) -> None:
+        """ Swap in new tag membership and rebuild the permission groups derived from it. """
 
-        # Check if the user is whitelisted for any of the provided tags
-        for tag in tags:
-            if tag.lower() == username:
-                return True
-            elif tag in self.whitelist and username in self.whitelist[tag]:
-                return True
-            
-        return False
+        # Intern tags and usernames so each string is stored once across all maps
+        whitelist = {
+            sys.intern(tag): tuple(sorted({sys.intern(member) for member in members}))
+            for tag, members in new_whitelist.items()
+        }
 
-    def members_cache(self, tag: str) -> list[str]:
+        # Create @everyone by merging all members from all tags
+        whitelist["@everyone"] = tuple(sorted({member for members in whitelist.values() for member in members}))
+
+        # Precompute the allowed users of every config group; entries that are not tags are literal usernames
+        groups = {}
+        for group, tags in self.group_config.items():
+            allowed = set()
+            for tag in tags:
+                tag = tag.lower()
+                allowed.add(sys.intern(tag))
+                allowed.update(whitelist.get(tag, ()))
+            groups[group] = frozenset(allowed)
+
+        # Swap every structure in together so readers never mix old and new data
+        self.whitelist = whitelist
+        self.groups = groups
+        self.generation += 1
+
+        # Recompile the mention matcher only when tags were added, renamed or removed
+        tags = frozenset(tag for tags in self.tag_cache.values() for tag in tags)
+        if tags != self._matcher_tags:
+            self.matcher = TagMatcher(self.tag_cache)
+            self._matcher_tags = tags
+
+    def reconfigure(self, config) -> None:
+        """ Apply a reloaded [Whitelist] section: new groups are rebuilt from the cached membership, a new cron reschedules the refresh. """
+
+        group_config = {group: config['Whitelist'].get(group, []) for group in PERMISSION_GROUPS}
+        if group_config != self.group_config:
+            self.group_config = group_config
+            self._apply(self.whitelist)
+            logging.info("modules/whitelist - Permission groups reloaded.")
+
+        self.sync.full_resync_interval = config['Whitelist'].get('FullResyncMinutes', 30) * 60
+
+        cron = config['Whitelist']['cron']
+        if cron != self.cron:
+            self._job.reschedule('cron', **{field: value for field, value in zip(['minute', 'hour', 'day', 'month', 'day_of_week'], cron.split())})
+            self.cron = cron
+            logging.info("modules/whitelist - Whitelist refresh rescheduled with cron: " + cron)
+
+    def is_user_allowed(self, username: str, group: str) -> bool:
+        """ Check if a user is allowed by a config group in [Whitelist] (e.g. 'General', 'Quiz'). """
+
+        return "@" + username.lower() in self.groups.get(group, ())
+
+    def members_cache(self, tag: str) -> tuple[str, ...]:
         """ Returns the cached members for a given tag and kind. """
         
-        if tag in self.whitelist:
-            return self.whitelist[tag]
-        
-        return []
\ No newline at end of file
+        return self.whitelist.get(tag, ())